@@ -2,6 +2,8 @@
 
 import streamlit as st
 
+from happiness import warmup
+
 # -------------------------------
 # Page Configuration
 # -------------------------------
@@ -11,6 +13,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Load the plotting stack and the dataset in the background while this page is read
+warmup.start()
+
 # -------------------------------
 # Main Title
 # -------------------------------
@@ -0,0 +1,270 @@
+# ---------------------------
+# Page Benchmarks
+# ---------------------------
+"""
+Measure what each page costs to render, headlessly, via Streamlit's AppTest.
+
+For every scale (copies of the 158-row 2015 file) a synthetic dataset is
+written to a temporary folder, and every page runs in a fresh Python
+process pointed at it through ``HAPPINESS_DATA_DIR``. Each run reports:
+
+- ``cold_s``: first run in a new process (imports, data load, all charts)
+- ``warm_s``: median rerun with unchanged widgets
+- ``sweep_mean_s`` / ``sweep_max_s``: reruns while stepping the sidebar widgets
+- ``cold_cpu_s`` / ``rerun_cpu_s``: server CPU time (user + system) of the
+  first run and the mean of the later runs, to compare render modes
+- ``peak_rss_mb``: peak resident memory of the process
+- ``images``: charts sent by the last run, ``open_figures``: pyplot figures left open
+
+Usage::
+
+    python benchmarks/bench_pages.py --output baseline.json      # record a baseline
+    python benchmarks/bench_pages.py --baseline baseline.json    # later: check for regressions
+
+With ``--baseline`` the results are compared to an earlier ``--output`` file
+and the exit status is 1 when any page got slower or bigger than
+``--tolerance`` allows.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAGES = [
+    "app.py",
+    "pages/1_Country_Explorer.py",
+    "pages/2_Regional_Filter.py",
+    "pages/3_Global_Summary.py",
+    "pages/4_Top_Trends.py",
+]
+
+# (widget type, label, values to step through) per page
+SWEEPS = {
+    "app.py": [],
+    "pages/1_Country_Explorer.py": [
+        ("selectbox", "Select a country", ["Finland", "Brazil", "Togo", "Pakistan"]),
+        ("slider", "Select rank range", [(1, 10), (20, 80), (50, 150), (1, 20)]),
+    ],
+    "pages/2_Regional_Filter.py": [
+        ("selectbox", "Select Region:", ["Western Europe", "Sub-Saharan Africa", "Southern Asia"]),
+        ("selectbox", "Compare with metric:", ["Family", "Freedom", "Generosity"]),
+    ],
+    "pages/3_Global_Summary.py": [
+        ("slider", "Show countries ranked up to:", [10, 100, 150, 50]),
+    ],
+    "pages/4_Top_Trends.py": [
+        ("slider", "Minimum Happiness Score", [3.0, 6.0, 7.0, 5.0]),
+        ("selectbox", "Select Region (optional):", ["Western Europe", "Latin America and Caribbean", "All"]),
+        ("text_input", "Search Country (optional):", ["a", "an", "land", ""]),
+    ],
+}
+
+# Compared against the baseline; a change only counts past both the relative and absolute margin
+COMPARED = {"cold_s": 0.25, "warm_s": 0.05, "sweep_mean_s": 0.05, "cold_cpu_s": 0.25, "peak_rss_mb": 20}
+
+WARM_RUNS = 3
+
+
+# ---------------------------
+# Worker: one page, one process
+# ---------------------------
+def find_widget(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no {kind} labelled {label!r}")
+
+
+def set_widget(widget, kind, value):
+    if kind == "text_input":
+        widget.input(value)
+    elif kind == "selectbox":
+        widget.select(value)
+    else:
+        widget.set_value(value)
+
+
+def cpu_time():
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    # AppTest runs pages outside a multipage app, so st.page_link cannot resolve its target
+    errors = [e.value for e in at.exception if "Could not find page" not in e.value]
+    if errors:
+        raise RuntimeError(f"page raised: {errors[0]}")
+    return elapsed
+
+
+def run_page(page, timeout):
+    import resource
+
+    import matplotlib.pyplot as plt
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+
+    at = AppTest.from_file(page, default_timeout=timeout)
+    cpu_start = cpu_time()
+    cold = timed_run(at)
+    cold_cpu = cpu_time() - cpu_start
+    warm = statistics.median(timed_run(at) for _ in range(WARM_RUNS))
+
+    sweep = []
+    for kind, label, values in SWEEPS[page]:
+        for value in values:
+            widget = find_widget(at, kind, label)
+            if kind == "selectbox" and value not in widget.options:
+                continue
+            if kind == "slider" and isinstance(value, tuple):
+                value = tuple(min(v, widget.max) for v in value)
+            elif kind == "slider":
+                value = min(value, widget.max)
+            set_widget(widget, kind, value)
+            sweep.append(timed_run(at))
+    rerun_cpu = (cpu_time() - cpu_start - cold_cpu) / (WARM_RUNS + len(sweep))
+
+    return {
+        "page": page,
+        "cold_s": round(cold, 4),
+        "warm_s": round(warm, 4),
+        "sweep_mean_s": round(statistics.mean(sweep), 4) if sweep else None,
+        "sweep_max_s": round(max(sweep), 4) if sweep else None,
+        "sweep_steps": len(sweep),
+        "cold_cpu_s": round(cold_cpu, 4),
+        "rerun_cpu_s": round(rerun_cpu, 4),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "images": len(at.get("imgs")),
+        "open_figures": len(plt.get_fignums()),
+    }
+
+
+def prepare():
+    """Build the Parquet cache once so page runs measure loading, not conversion."""
+    sys.path.insert(0, str(ROOT))
+    from happiness.data import ingest
+
+    start = time.perf_counter()
+    ingest()
+    return {"ingest_s": round(time.perf_counter() - start, 4)}
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+def in_subprocess(args, env):
+    out = subprocess.run(
+        [sys.executable, __file__, *args], env=env, cwd=ROOT,
+        capture_output=True, text=True, check=False,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def benchmark(scales, pages, render_workers, render_mode, timeout):
+    from synthetic import make_dataset
+
+    results = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix=f"happiness-x{scale}-") as folder:
+            make_dataset(scale, folder)
+            env = dict(
+                os.environ, HAPPINESS_DATA_DIR=folder, HAPPINESS_RENDER_WORKERS=str(render_workers),
+                HAPPINESS_RENDER_MODE=render_mode,
+            )
+            ingest = in_subprocess(["--prepare"], env)
+            print(f"x{scale}: {158 * scale} rows, ingest {ingest['ingest_s']:.2f}s", file=sys.stderr)
+            for page in pages:
+                row = in_subprocess(["--worker", page, "--timeout", str(timeout)], env)
+                row.update(scale=scale, rows=158 * scale, **ingest)
+                results.append(row)
+                print(
+                    f"  {page:<30} cold {row['cold_s']:6.2f}s  warm {row['warm_s']:6.2f}s  "
+                    f"sweep {row['sweep_mean_s'] or 0:6.2f}s  cpu {row['cold_cpu_s']:6.2f}s  "
+                    f"rss {row['peak_rss_mb']:7.1f}MB  "
+                    f"images {row['images']}  open figs {row['open_figures']}",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return one message per metric that regressed beyond ``tolerance``."""
+    previous = {(row["page"], row["scale"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["page"], row["scale"]))
+        if old is None:
+            continue
+        for metric, margin in COMPARED.items():
+            before, after = old.get(metric), row.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > margin:
+                regressions.append(
+                    f"{row['page']} x{row['scale']}: {metric} {before} -> {after}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--render-workers", type=int, default=0)
+    parser.add_argument("--render-mode", choices=["server", "client"], default="server")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        print(json.dumps(prepare()))
+        return 0
+    if args.worker:
+        print(json.dumps(run_page(args.worker, args.timeout)))
+        return 0
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "render_workers": args.render_workers,
+            "render_mode": args.render_mode,
+        },
+        "results": benchmark(args.scales, args.pages, args.render_workers, args.render_mode, args.timeout),
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(report["results"], json.loads(args.baseline.read_text()), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
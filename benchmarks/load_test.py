@@ -0,0 +1,496 @@
+# ---------------------------
+# Concurrent Session Load Test
+# ---------------------------
+"""
+Simulate many concurrent sessions on one server process and watch for leaks.
+
+Each simulated session is a headless Streamlit ``AppTest`` of ``app.py``
+on its own thread, as the server runs each session's script on its own
+thread. A session keeps one session state across pages, like a browser tab.
+It loops until the run ends: switch to a random page (or stay), move one
+random widget on it, rerun, and record the rerun's latency.
+
+While the sessions run, a monitor samples, every ``--interval`` seconds:
+resident memory, open pyplot figures, live matplotlib ``Figure`` objects,
+tracked Python objects and reruns done (after a garbage collection, so
+only live memory counts). The report has:
+
+- ``reruns_per_s`` and the p50 / p95 / p99 rerun latency, overall and per page
+- ``per_session``: memory each session holds once every session has opened
+  every page, over a baseline with the shared caches already warm: the live
+  Python and NumPy heap it added (``tracemalloc``) and, coarser, the resident
+  memory
+- the growth per minute of memory, live figures and objects over the second
+  half of the run, after the caches have filled, taken on their floor (the
+  lowest reading from each sample on) so reruns in flight do not count
+
+A sustained growth past ``--leak-mb-per-min`` / ``--leak-objects-per-min``
+is reported as a leak, and so is any pyplot figure still open, or
+``Figure`` still alive, once the sessions have stopped (figures being drawn
+are alive while scripts run; Streamlit closes pyplot's after each run, so
+one left alive is referenced from somewhere). With ``--fail-on-leak`` the exit status is
+then 1. The caches are bounded (``HAPPINESS_RESULT_CACHE_MB`` and the
+loaders' ``max_entries``) but take a while to fill, and until they do their
+growth reads as a leak: for a leak check, shrink the result cache with
+``--cache-mb`` and run for a few minutes.
+
+Usage::
+
+    python benchmarks/load_test.py --sessions 8 --duration 120
+    python benchmarks/load_test.py --sessions 4 --scale 10 --output load.json
+    python benchmarks/load_test.py --cache-mb 8 --duration 300 --fail-on-leak    # leak check
+
+A rerun that raises or times out is listed under ``errors`` and the
+session moves on; a session that stops is counted in ``failed_sessions``.
+If one fails, or hangs, before every session has opened every page, the
+test stops with exit status 2 rather than waiting for it.
+
+Fragment reruns are not simulated: every widget move reruns the whole page,
+which is the upper bound of what an interaction costs.
+"""
+
+import argparse
+import contextlib
+import ctypes
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAGES = [
+    "app.py",
+    "pages/1_Country_Explorer.py",
+    "pages/2_Regional_Filter.py",
+    "pages/3_Global_Summary.py",
+    "pages/4_Top_Trends.py",
+]
+
+WIDGETS = ["selectbox", "slider", "radio", "checkbox", "toggle", "text_input"]
+SEARCHES = ["", "a", "an", "land", "ia", "stan"]
+
+# Chance that a step moves to another page instead of a widget on the current one
+NAVIGATE = 0.3
+
+
+# ---------------------------
+# Process Measurements
+# ---------------------------
+def trim():
+    """Collect garbage and hand freed heap back to the OS, so memory readings show what is live."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):  # not glibc
+        pass
+
+
+def rss_mb():
+    """Current resident memory (``ru_maxrss`` would only give the peak)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def sample(start, reruns):
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    trim()
+    objects = gc.get_objects()
+    return {
+        "t_s": round(time.perf_counter() - start, 2),
+        "reruns": reruns,
+        "rss_mb": round(rss_mb(), 1),
+        "open_figures": len(plt.get_fignums()),
+        "live_figures": sum(1 for obj in objects if isinstance(obj, Figure)),
+        "objects": len(objects),
+    }
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else None
+
+
+def floor_growth(samples, key):
+    """
+    Least-squares growth per minute of the lowest ``key`` reading from each
+    sample on. Memory of reruns in flight comes and goes; a leak raises the floor.
+    """
+    if len(samples) < 3:
+        return 0.0
+    xs = [row["t_s"] for row in samples]
+    ys = [row[key] for row in samples]
+    for i in range(len(ys) - 2, -1, -1):
+        ys[i] = min(ys[i], ys[i + 1])
+    x_mean, y_mean = statistics.fmean(xs), statistics.fmean(ys)
+    spread = sum((x - x_mean) ** 2 for x in xs)
+    if not spread:
+        return 0.0
+    return 60 * sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / spread
+
+
+# ---------------------------
+# Concurrent AppTests
+# ---------------------------
+def share_runtime():
+    """
+    Let ``AppTest`` runs overlap in one process.
+
+    Each run normally installs a fresh mock runtime and app-test config
+    option, and removes them when it ends, so a run finishing would pull them
+    from under the others. Here one mock runtime is installed for the
+    process and the per-run swap is pointed at a stand-in.
+
+    Returns the shared media file manager, which the monitor clears as the
+    server does after reruns (nothing else releases the images).
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    class PerRunRuntime:
+        _instance = None
+
+    app_test.Runtime = PerRunRuntime
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+    return runtime.media_file_mgr
+
+
+def release_media(media):
+    media.clear_session_refs("test session id")  # every AppTest session uses this id
+    media.remove_orphaned_files()
+
+
+def settle(media):
+    """Wait for finished script threads to let go of their frames, then free what they held."""
+    time.sleep(1)
+    release_media(media)
+    trim()
+
+
+def radio_value(widget, option):
+    # The tree holds the formatted labels; find the raw value behind one (e.g. "Pearson" -> "pearson")
+    for value in (option, option.lower()):
+        if widget.format_func(value) == option:
+            return value
+    return None
+
+
+def move_widget(at, rng):
+    """Move one random widget of the page; False when it has none that can move."""
+    widgets = [(kind, widget) for kind in WIDGETS for widget in getattr(at, kind) if not widget.disabled]
+    rng.shuffle(widgets)
+    for kind, widget in widgets:
+        if kind == "selectbox" and widget.options:
+            widget.select_index(rng.randrange(len(widget.options)))
+        elif kind == "radio" and widget.options:
+            value = radio_value(widget, rng.choice(widget.options))
+            if value is None:
+                continue
+            widget.set_value(value)
+        elif kind == "slider":
+            steps = int(round((widget.max - widget.min) / widget.step)) if widget.step else 0
+            picks = sorted(widget.min + rng.randint(0, steps) * widget.step for _ in range(2))
+            if isinstance(widget.min, int):
+                picks = [int(pick) for pick in picks]
+            else:
+                picks = [round(pick, 6) for pick in picks]
+            widget.set_value(tuple(picks) if isinstance(widget.value, (tuple, list)) else picks[0])
+        elif kind in ("checkbox", "toggle"):
+            widget.set_value(not widget.value)
+        elif kind == "text_input":
+            widget.input(rng.choice(SEARCHES))
+        else:
+            continue
+        return True
+    return False
+
+
+class Session(threading.Thread):
+    """One simulated browser tab: a random walk over the pages and their widgets."""
+
+    def __init__(self, number, seed, ramp, stop, timeout, record):
+        super().__init__(name=f"session-{number}", daemon=True)
+        self.rng = random.Random(seed)
+        self.ramp, self.stop, self.timeout, self.record = ramp, stop, timeout, record
+        self.errors = []
+        self.failed = False
+        self.opened = False  # reached the ramp barrier
+
+    def rerun(self, at, page):
+        start = time.perf_counter()
+        try:
+            at.run(timeout=self.timeout)
+        except Exception as exc:  # e.g. the rerun timed out; the session goes on from its next step
+            self.errors.append(f"{page}: {type(exc).__name__}: {exc}")
+            return
+        elapsed = time.perf_counter() - start
+        # st.page_link targets may not resolve under AppTest
+        errors = [e.value for e in at.exception if "Could not find page" not in e.value]
+        if errors:
+            self.errors.append(f"{page}: {errors[0]}")
+        self.record(page, elapsed)
+
+    def run(self):
+        try:
+            self.walk()
+        except threading.BrokenBarrierError:
+            self.failed = True  # another session failed during the ramp, which reports it
+        except Exception as exc:
+            self.failed = True
+            self.errors.append(f"{self.name} stopped: {type(exc).__name__}: {exc}")
+            if not self.opened:
+                # It would never reach the barrier: release the driver and the other sessions. Once it
+                # has, it must not: threads just released could still see the barrier broken
+                self.ramp.abort()
+
+    def walk(self):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=self.timeout)
+        # Open every page once, then wait until all sessions have, to measure memory per session
+        for page in PAGES:
+            at.switch_page(page)
+            self.rerun(at, page)
+        page = PAGES[-1]
+        self.opened = True
+        self.ramp.wait()
+        self.ramp.wait()  # held while the driver measures memory
+
+        while not self.stop.is_set():
+            if self.rng.random() < NAVIGATE or not move_widget(at, self.rng):
+                page = self.rng.choice(PAGES)
+                at.switch_page(page)
+            self.rerun(at, page)
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+class RampFailed(RuntimeError):
+    """A session failed, or hung, before every session had opened every page."""
+
+
+def load_test(sessions, duration, interval, seed, timeout):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    media = share_runtime()
+    set_log_level("error")  # after the config is parsed, which resets it; page errors go in the report
+
+    # One session opens every page first: imports, data and shared caches count as baseline
+    warm = AppTest.from_file(str(ROOT / "app.py"), default_timeout=timeout)
+    for page in PAGES:
+        warm.switch_page(page).run()
+    del warm
+    settle(media)
+    before = sample(time.perf_counter(), 0)
+
+    latencies, lock = {page: [] for page in PAGES}, threading.Lock()
+
+    def record(page, elapsed):
+        with lock:
+            latencies[page].append(elapsed)
+
+    # Allocations made while every session opens every page, and still live after, are the sessions' own
+    tracemalloc.start()
+    ramp, stop = threading.Barrier(sessions + 1), threading.Event()
+    workers = [Session(number, seed + number, ramp, stop, timeout, record) for number in range(sessions)]
+    for worker in workers:
+        worker.start()
+    # Each rerun is bounded by the timeout, so a ramp that takes longer than all of them has hung
+    ramp_timeout = timeout * len(PAGES) + 60
+    try:
+        ramp.wait(ramp_timeout)
+    except threading.BrokenBarrierError:
+        stop.set()
+        ramp.abort()
+        errors = [error for worker in workers for error in worker.errors]
+        raise RampFailed("; ".join(errors[:5]) or f"sessions did not open every page within {ramp_timeout:.0f}s")
+    settle(media)
+    per_session = {
+        "heap_mb": round(tracemalloc.get_traced_memory()[0] / sessions / 2**20, 2),
+        "rss_mb": round((rss_mb() - before["rss_mb"]) / sessions, 2),  # coarse: allocator arenas per thread
+    }
+    tracemalloc.stop()
+    ramp.wait(ramp_timeout)  # measured: let the sessions go
+    ramp_reruns = sessions * len(PAGES)
+    print(
+        f"{sessions} sessions open: {per_session['heap_mb']} MB heap, {per_session['rss_mb']} MB resident each "
+        f"(baseline {before['rss_mb']:.0f} MB)",
+        file=sys.stderr,
+    )
+
+    start = time.perf_counter()
+    samples = []
+    while True:
+        release_media(media)
+        done = sum(map(len, latencies.values())) - ramp_reruns
+        samples.append(sample(start, done))
+        last = samples[-1]
+        print(
+            f"  {last['t_s']:6.0f}s  reruns {done:6d}  rss {last['rss_mb']:7.1f}MB  "
+            f"open figs {last['open_figures']:4d}  live figs {last['live_figures']:4d}  objects {last['objects']:9d}",
+            file=sys.stderr,
+        )
+        if last["t_s"] >= duration:
+            break
+        time.sleep(min(interval, max(duration - last["t_s"], 0.1)))
+    stop.set()
+    for worker in workers:
+        worker.join(timeout)
+    elapsed = time.perf_counter() - start
+    # No script is running now: every figure still open or alive was left behind
+    settle(media)
+    after = sample(start, sum(map(len, latencies.values())) - ramp_reruns)
+
+    return summarize(latencies, samples, elapsed, ramp_reruns, per_session, before, after, workers)
+
+
+def summarize(latencies, samples, elapsed, ramp_reruns, per_session, before, after, workers):
+    every = [value for values in latencies.values() for value in values]
+    steady = samples[len(samples) // 2:] + [after]
+
+    def stats(values):
+        return {
+            "reruns": len(values),
+            "p50_s": round(percentile(values, 50), 4) if values else None,
+            "p95_s": round(percentile(values, 95), 4) if values else None,
+            "p99_s": round(percentile(values, 99), 4) if values else None,
+        }
+
+    return {
+        "reruns_per_s": round((len(every) - ramp_reruns) / elapsed, 2),
+        "latency": stats(every),
+        "pages": {page: stats(values) for page, values in latencies.items()},
+        "per_session": per_session,
+        "before": before,
+        "after": after,
+        "growth_per_min": {
+            key: round(floor_growth(steady, key), 2) for key in ("rss_mb", "live_figures", "objects")
+        },
+        "failed_sessions": sum(worker.failed for worker in workers),
+        "errors": [error for worker in workers for error in worker.errors][:20],
+        "samples": samples,
+    }
+
+
+def leaks(report, mb_per_min, objects_per_min):
+    growth, before, after = report["growth_per_min"], report["before"], report["after"]
+    found = []
+    if growth["rss_mb"] > mb_per_min:
+        found.append(f"resident memory grows {growth['rss_mb']} MB/min")
+    if growth["objects"] > objects_per_min:
+        found.append(f"Python objects grow {growth['objects']:.0f}/min")
+    # While scripts run, figures being drawn are open; once they stop, none should be
+    if after["open_figures"] > before["open_figures"]:
+        found.append(f"{after['open_figures'] - before['open_figures']} pyplot figures left open (never closed)")
+    if after["live_figures"] > before["live_figures"]:
+        found.append(f"{after['live_figures'] - before['live_figures']} Figure objects still alive after the run")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--duration", type=float, default=120, help="seconds of random navigation")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between memory samples")
+    parser.add_argument("--scale", type=int, help="run on a synthetic dataset this many times the 2015 file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render-workers", type=int, help="HAPPINESS_RENDER_WORKERS for the run")
+    parser.add_argument("--cache-mb", type=int, help="HAPPINESS_RESULT_CACHE_MB for the run (small: caches fill fast)")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds a single rerun may take")
+    parser.add_argument("--leak-mb-per-min", type=float, default=5.0)
+    parser.add_argument("--leak-objects-per-min", type=float, default=20000)
+    parser.add_argument("--fail-on-leak", action="store_true", help="exit code 1 when a leak is found")
+    parser.add_argument("--output", type=Path, help="write the report (with all samples) as JSON")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    if args.render_workers is not None:
+        os.environ["HAPPINESS_RENDER_WORKERS"] = str(args.render_workers)
+    if args.cache_mb is not None:
+        os.environ["HAPPINESS_RESULT_CACHE_MB"] = str(args.cache_mb)
+
+    with contextlib.ExitStack() as stack:
+        # Settings are read on import, so the data folder is set before the app is loaded
+        if args.scale:
+            from synthetic import make_dataset
+
+            folder = stack.enter_context(tempfile.TemporaryDirectory(prefix=f"happiness-x{args.scale}-"))
+            make_dataset(args.scale, folder)
+            os.environ["HAPPINESS_DATA_DIR"] = folder
+        try:
+            report = load_test(args.sessions, args.duration, args.interval, args.seed, args.timeout)
+        except RampFailed as exc:
+            print(f"load test aborted, a session failed while opening the pages: {exc}", file=sys.stderr)
+            return 2
+
+    report["meta"] = {
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "sessions": args.sessions,
+        "duration_s": args.duration,
+        "scale": args.scale,
+        "cache_mb": args.cache_mb,
+        "seed": args.seed,
+    }
+    found = leaks(report, args.leak_mb_per_min, args.leak_objects_per_min)
+    report["leaks"] = found
+
+    latency = report["latency"]
+    print(
+        f"{report['reruns_per_s']} reruns/s  p50 {latency['p50_s']}s  p95 {latency['p95_s']}s  "
+        f"p99 {latency['p99_s']}s  {report['per_session']['heap_mb']} MB heap/session",
+        file=sys.stderr,
+    )
+    for page, row in report["pages"].items():
+        print(f"  {page:<30} reruns {row['reruns']:5d}  p50 {row['p50_s']}s  p95 {row['p95_s']}s  p99 {row['p99_s']}s",
+              file=sys.stderr)
+    print(f"growth per minute: {report['growth_per_min']}", file=sys.stderr)
+    if report["failed_sessions"]:
+        print(f"{report['failed_sessions']} of {args.sessions} sessions stopped early", file=sys.stderr)
+    for error in report["errors"]:
+        print(f"ERROR {error}", file=sys.stderr)
+    for message in found:
+        print(f"LEAK {message}", file=sys.stderr)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 1 if found and args.fail_on_leak else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# ---------------------------
+# Synthetic Datasets
+# ---------------------------
+"""
+Scaled copies of ``data/2015.csv`` for benchmarks and load tests.
+
+``make_dataset(scale, folder)`` writes ``folder/2015.csv`` holding ``scale``
+copies of the 158 real rows. Copy 0 keeps the real names; copy k renames
+each country to ``"<name> #k"`` and jitters its scores slightly, then the
+Happiness Rank is recomputed over all rows.
+
+``make_respondents(rows, folder)`` writes ``folder/respondents/2015.csv``
+with ``rows`` respondent-level answers scattered around each real
+country's scores, for the streaming ingestion path.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOURCE = Path(__file__).resolve().parent.parent / "data" / "2015.csv"
+
+JITTERED = [
+    "Happiness Score", "Economy (GDP per Capita)", "Family", "Health (Life Expectancy)",
+    "Freedom", "Trust (Government Corruption)", "Generosity", "Dystopia Residual",
+]
+
+
+def make_dataset(scale, folder, seed=2015):
+    """Write a ``scale`` x 158-row ``2015.csv`` into ``folder`` and return its path."""
+    base = pd.read_csv(SOURCE)
+    rng = np.random.default_rng(seed)
+
+    copies = []
+    for k in range(scale):
+        copy = base.copy()
+        if k:
+            copy["Country"] = copy["Country"] + f" #{k}"
+            noise = rng.normal(0, 0.02, size=(len(copy), len(JITTERED)))
+            copy[JITTERED] = (copy[JITTERED] + noise).clip(lower=0)
+        copies.append(copy)
+
+    df = pd.concat(copies, ignore_index=True)
+    df["Happiness Rank"] = df["Happiness Score"].rank(ascending=False, method="first").astype(int)
+    df = df.sort_values("Happiness Rank")
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / "2015.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def make_respondents(rows, folder, seed=2015, chunk_rows=500_000):
+    """Write ``rows`` synthetic respondents for the 2015 countries and return the file's path."""
+    base = pd.read_csv(SOURCE)
+    rng = np.random.default_rng(seed)
+    values = ["Happiness Score"] + JITTERED[1:-1]
+
+    folder = Path(folder) / "respondents"
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / "2015.csv"
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        picked = base.iloc[rng.integers(0, len(base), size=n)]
+        chunk = pd.DataFrame({"Country": picked["Country"].to_numpy(), "Region": picked["Region"].to_numpy()})
+        for col in values:
+            spread = 1.5 if col == "Happiness Score" else 0.1
+            chunk[col] = (picked[col].to_numpy() + rng.normal(0, spread, size=n)).round(4)
+        chunk["Weight"] = rng.uniform(0.5, 1.5, size=n).round(3)
+        chunk.to_csv(path, mode="a" if written else "w", header=not written, index=False)
+        written += n
+    return path
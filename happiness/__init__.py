@@ -0,0 +1,3 @@
+# happiness/__init__.py
+#
+# Shared helpers used by the dashboard pages.
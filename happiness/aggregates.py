@@ -0,0 +1,104 @@
+# ---------------------------
+# Precomputed Aggregate Cube
+# ---------------------------
+"""
+Region x measure x year x score-bucket aggregates, built once per data load.
+
+Each cell of the cube stores the sum, count, min and max of a measure for
+the countries of one region, in one year, whose Happiness Score falls in
+one ``BUCKET_WIDTH`` wide bucket. Regional means and "score >= threshold"
+filters are then answered by adding up a handful of cells instead of
+rescanning the rows.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import FACTORS, data_version, load_data, rebuild_by_group
+from happiness.result_cache import results
+
+MEASURES = ["Happiness Score", "Happiness Rank"] + FACTORS + ["Dystopia Residual"]
+
+# Matches the step of the score sliders, so thresholds always fall on a bucket edge
+BUCKET_WIDTH = 0.01
+
+STATS = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def score_bucket(scores):
+    # Round before flooring so 5.01 / 0.01 does not land in bucket 500
+    return np.floor(np.round(np.asarray(scores) / BUCKET_WIDTH, 6)).astype("int64")
+
+
+def build_cube(df):
+    """Return the cube for ``df`` with ``(measure, stat)`` columns."""
+    keyed = df.assign(
+        Region=df["Region"].astype(str),
+        Bucket=score_bucket(df["Happiness Score"]),
+    )
+    grouped = keyed.groupby(["Year", "Region", "Bucket"])[MEASURES]
+    return grouped.agg(list(STATS))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cube(version):
+    profiling.cache_miss("cube")
+
+    def compute():
+        df = load_data()
+        with profiling.timed("build_cube", "aggregate"):
+            # After an update of data/, only the changed (Year, Region) groups are built again
+            return rebuild_by_group("cube", build_cube, df)
+
+    # Another process or replica may already have built this version's cube
+    return results().get_or_compute("cube", (), compute)
+
+
+def load_cube():
+    """Return the cube for the current contents of ``data/``, shared by all sessions."""
+    return profiling.cache_lookup("cube", "aggregate", _load_cube, data_version())
+
+
+# ---------------------------
+# Cube Queries
+# ---------------------------
+def _select(cube, year, min_score=None, region=None):
+    part = cube.xs(year, level="Year")
+    if min_score is not None:
+        part = part[part.index.get_level_values("Bucket") >= score_bucket(min_score)]
+    if region is not None:
+        part = part[part.index.get_level_values("Region") == region]
+    return part
+
+
+def _finish(stats):
+    stats["mean"] = stats["sum"] / stats["count"]
+    return stats
+
+
+def region_summary(cube, year, measure, min_score=None, region=None):
+    """Per-region mean/count/min/max/sum of ``measure`` for countries scoring at least ``min_score``."""
+    with profiling.timed("region_summary", "aggregate"):
+        part = _select(cube, year, min_score, region)[measure]
+        return _finish(part.groupby(level="Region").agg(STATS))
+
+
+def region_means(cube, year, measure, min_score=None, region=None):
+    return region_summary(cube, year, measure, min_score, region)["mean"]
+
+
+def measure_summary(cube, year, measures, min_score=None, region=None):
+    """Mean/count/min/max/sum of each of ``measures`` over the matching countries."""
+    with profiling.timed("measure_summary", "aggregate"):
+        part = _select(cube, year, min_score, region)[measures]
+        stats = pd.DataFrame({
+            stat: getattr(part.xs(stat, axis=1, level=1), how)()
+            for stat, how in STATS.items()
+        })
+        return _finish(stats)
+
+
+def measure_means(cube, year, measures, min_score=None, region=None):
+    return measure_summary(cube, year, measures, min_score, region)["mean"]
@@ -0,0 +1,457 @@
+# ---------------------------
+# Shared Data Layer
+# ---------------------------
+"""
+Load the yearly World Happiness CSV files once per server process.
+
+Every ``data/<year>.csv`` is harmonized to the 2015 column names, tagged
+with a ``Year`` column and written to a Parquet file in ``data/.cache``.
+Ingestion is incremental: a manifest records the SHA-256 of each CSV, so
+only new or edited files are parsed again. Pages read the Parquet files
+memory-mapped through ``st.cache_resource``, so every session shares one
+long-format table.
+
+A year can instead be supplied as respondent-level rows in
+``data/respondents/<year>.csv``; ``happiness.streaming`` folds those into
+the same country table in bounded memory.
+
+The current state of ``data/`` is a ``Snapshot`` with a content version
+per year. Caches of one year's rows are keyed on ``year_version(year)``
+and caches over all years on ``data_version()``, so an edit to one CSV
+leaves the other years' entries valid. A new snapshot diffs its table
+against the previous one by (Country, Year), and ``rebuild_by_group``
+uses that to rebuild only the changed groups of per-(Year, Region)
+tables. ``happiness.refresh`` moves to new snapshots as ``data/`` changes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from happiness import profiling, settings
+
+DATA_DIR = settings.DATA_DIR
+CACHE_DIR = DATA_DIR / ".cache"
+MANIFEST = CACHE_DIR / "manifest.json"
+RESPONDENTS_DIR = DATA_DIR / "respondents"
+
+CATEGORICAL_COLUMNS = ["Country", "Region"]
+
+FACTORS = [
+    "Economy (GDP per Capita)", "Family", "Health (Life Expectancy)",
+    "Freedom", "Trust (Government Corruption)", "Generosity"
+]
+
+COLUMNS = (
+    ["Year", "Country", "Region", "Happiness Rank", "Happiness Score", "Standard Error"]
+    + FACTORS
+    + ["Dystopia Residual", "Respondents"]
+)
+
+# Column names used by the 2016-2019 releases, mapped to the 2015 schema
+COLUMN_ALIASES = {
+    "Country or region": "Country",
+    "Happiness.Rank": "Happiness Rank",
+    "Overall rank": "Happiness Rank",
+    "Happiness.Score": "Happiness Score",
+    "Score": "Happiness Score",
+    "Economy..GDP.per.Capita.": "Economy (GDP per Capita)",
+    "GDP per capita": "Economy (GDP per Capita)",
+    "Social support": "Family",
+    "Health..Life.Expectancy.": "Health (Life Expectancy)",
+    "Healthy life expectancy": "Health (Life Expectancy)",
+    "Freedom to make life choices": "Freedom",
+    "Trust..Government.Corruption.": "Trust (Government Corruption)",
+    "Perceptions of corruption": "Trust (Government Corruption)",
+    "Dystopia.Residual": "Dystopia Residual",
+}
+
+# Countries whose spelling changed between releases, mapped to the 2015 name
+COUNTRY_ALIASES = {
+    "Hong Kong S.A.R., China": "Hong Kong",
+    "Taiwan Province of China": "Taiwan",
+    "Trinidad & Tobago": "Trinidad and Tobago",
+    "Northern Cyprus": "North Cyprus",
+    "North Macedonia": "Macedonia",
+    "Somaliland Region": "Somaliland region",
+}
+
+UNKNOWN_REGION = "Other"
+
+# Part of every Parquet name; bump it when parsing changes so cached files are rebuilt
+CACHE_FORMAT = 2
+
+
+# ---------------------------
+# Parsing & Harmonization
+# ---------------------------
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def harmonize(df, year):
+    """Rename ``df`` to the 2015 schema and add the ``Year`` column."""
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns=COLUMN_ALIASES)
+    df["Year"] = year
+    df["Country"] = df["Country"].str.strip().replace(COUNTRY_ALIASES)
+    if "Region" not in df:
+        df["Region"] = None  # filled from other years once all files are loaded
+
+    for col in COLUMNS[3:]:  # every column after Year, Country and Region is numeric
+        df[col] = pd.to_numeric(df[col], errors="coerce") if col in df else float("nan")
+
+    # 2018+ files drop the residual; it is whatever the six factors do not explain
+    missing = df["Dystopia Residual"].isna()
+    df.loc[missing, "Dystopia Residual"] = (
+        df.loc[missing, "Happiness Score"] - df.loc[missing, FACTORS].sum(axis=1, min_count=len(FACTORS))
+    )  # stays NaN when a factor is missing rather than absorbing it
+    df["Happiness Rank"] = df["Happiness Rank"].astype("int64")
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df[COLUMNS]
+
+
+def read_year(csv_path):
+    if csv_path.parent == RESPONDENTS_DIR:
+        from happiness.streaming import fold_respondents
+
+        with profiling.timed(f"stream_csv:{csv_path.name}", "load"):
+            return fold_respondents(csv_path, int(csv_path.stem))
+    with profiling.timed(f"parse_csv:{csv_path.name}", "load"):
+        return harmonize(pd.read_csv(csv_path), int(csv_path.stem))
+
+
+# ---------------------------
+# Incremental Parquet Cache
+# ---------------------------
+def year_files():
+    """Return the yearly summary and respondent CSV files in ``data/``, oldest first."""
+    files = [p for folder in (DATA_DIR, RESPONDENTS_DIR) for p in folder.glob("*.csv") if p.stem.isdigit()]
+    return sorted(files, key=lambda p: (int(p.stem), p.parent != DATA_DIR))
+
+
+def read_manifest():
+    try:
+        return json.loads(MANIFEST.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_atomic(path, write):
+    # Write to a temporary file first so concurrent readers never see a partial file. Its name
+    # is unique, so processes sharing data/ that ingest the same CSV never write the same file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        write(tmp)
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def ingest():
+    """
+    Bring ``data/.cache`` up to date and return the Parquet path per year.
+
+    Files whose content hash matches the manifest are not parsed again.
+    """
+    CACHE_DIR.mkdir(exist_ok=True)
+    manifest = read_manifest()
+    updated = {}
+
+    years = {}
+    for csv_path in year_files():
+        name = csv_path.relative_to(DATA_DIR).as_posix()
+        if csv_path.stem in years:
+            raise ValueError(f"{years[csv_path.stem]} and {name} both describe {csv_path.stem}; keep one")
+        years[csv_path.stem] = name
+
+        digest = file_hash(csv_path)
+        out = CACHE_DIR / f"{csv_path.stem}-{digest[:12]}-v{CACHE_FORMAT}.parquet"
+        entry = manifest.get(name)
+        if entry and entry["parquet"] == out.name and out.exists():
+            updated[name] = entry
+            continue
+
+        df = read_year(csv_path)
+        write_atomic(out, lambda tmp: df.to_parquet(tmp, index=False))
+        updated[name] = {"sha256": digest, "parquet": out.name, "year": int(csv_path.stem)}
+
+    # Drop Parquet files for CSVs that were edited or removed
+    keep = {entry["parquet"] for entry in updated.values()}
+    for stale in CACHE_DIR.glob("*.parquet"):
+        if stale.name not in keep:
+            stale.unlink(missing_ok=True)
+
+    if updated != manifest:
+        write_atomic(MANIFEST, lambda tmp: tmp.write_text(json.dumps(updated, indent=2)))
+    return {entry["year"]: CACHE_DIR / entry["parquet"] for entry in updated.values()}
+
+
+def data_signature():
+    """Cheap fingerprint of ``data/`` used to notice added or edited files."""
+    return tuple((p.relative_to(DATA_DIR).as_posix(), p.stat().st_mtime_ns, p.stat().st_size) for p in year_files())
+
+
+def fill_regions(df):
+    """Give rows from releases without a Region column the region used in other years."""
+    known = df.dropna(subset=["Region"]).drop_duplicates("Country", keep="last")
+    regions = df["Country"].map(known.set_index("Country")["Region"])
+    df["Region"] = df["Region"].fillna(regions).fillna(UNKNOWN_REGION)
+    return df
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _year_frame(path):
+    # Keyed on the Parquet path, whose name carries the hash of the year's CSV
+    profiling.cache_miss("year_frame")
+    with profiling.timed(f"read_parquet:{path.name}", "load"):
+        # Yearly files carry different categories, so combine them as plain objects
+        return pd.read_parquet(path, memory_map=True).astype(dict.fromkeys(CATEGORICAL_COLUMNS, object))
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _year_regions(path):
+    return pd.read_parquet(path, columns=CATEGORICAL_COLUMNS).astype(object)
+
+
+def build_table(paths):
+    """The long-format table of the Parquet file per year in ``paths``."""
+    df = fill_regions(pd.concat([_year_frame(paths[year]) for year in sorted(paths)], ignore_index=True))
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df.sort_values(["Year", "Happiness Rank"], ignore_index=True)
+
+
+def year_versions(paths):
+    """
+    Content version per year: its Parquet file name, which carries the hash
+    of its CSV. Years with rows lacking a region take theirs from other
+    years (``fill_regions``), so their version also covers those regions.
+    """
+    frames = {year: _year_regions(path) for year, path in paths.items()}
+    borrowing = [year for year, frame in frames.items() if frame["Region"].isna().any()]
+    if borrowing:
+        known = pd.concat([frames[year] for year in sorted(frames)]).dropna(subset=["Region"])
+        known = known.drop_duplicates("Country", keep="last")
+        regions = hashlib.sha256(repr(sorted(zip(known["Country"], known["Region"]))).encode()).hexdigest()[:12]
+    return {
+        year: path.name + (f"+regions-{regions}" if year in borrowing else "")
+        for year, path in paths.items()
+    }
+
+
+# ---------------------------
+# Snapshots & Changes
+# ---------------------------
+class DataChange:
+    """Rows added, removed or changed by an update of ``data/``, keyed by (Country, Year)."""
+
+    def __init__(self, added, removed, changed, groups):
+        self.added, self.removed, self.changed = added, removed, changed
+        self.groups = groups  # (Year, Region) groups whose rows differ
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self):
+        counts = {}
+        for kind in ("added", "removed", "changed"):
+            for _, year in getattr(self, kind):
+                counts.setdefault(year, {}).setdefault(kind, 0)
+                counts[year][kind] += 1
+        return "; ".join(
+            f"{year}: " + ", ".join(f"{n} {kind}" for kind, n in kinds.items())
+            for year, kinds in sorted(counts.items())
+        ) or "no rows changed"
+
+
+def diff_tables(old, new, years):
+    """Compare the rows of ``years`` in two tables by (Country, Year)."""
+    def keyed(df):
+        rows = df[df["Year"].isin(years)].astype({"Country": str, "Region": str}).set_index(["Country", "Year"])
+        return rows[~rows.index.duplicated()]
+
+    before, after = keyed(old), keyed(new)
+    added = after.index.difference(before.index)
+    removed = before.index.difference(after.index)
+    common = before.index.intersection(after.index)
+    a, b = before.loc[common], after.loc[common]
+    same = ((a == b) | (a.isna() & b.isna())).all(axis=1).to_numpy()
+    changed = common[~same]
+
+    groups = set()
+    for rows, keys in ((after, added.append(changed)), (before, removed.append(changed))):
+        groups |= {(int(year), region) for (_, year), region in rows["Region"].loc[keys].items()}
+    return DataChange(list(added), list(removed), list(changed), groups)
+
+
+class Snapshot:
+    """
+    One consistent state of ``data/``: the Parquet file and content version
+    of each year, and the long-format table, built on first use.
+
+    Caches of one year's rows are keyed on that year's version, so an update
+    that leaves a year alone leaves its cache entries valid.
+    """
+
+    def __init__(self, signature, paths, previous=None):
+        self.signature = signature
+        self.paths = paths
+        self.versions = year_versions(paths)
+        self.version = hashlib.sha256(
+            "\n".join(f"{year}:{version}" for year, version in sorted(self.versions.items())).encode()
+        ).hexdigest()[:16]
+        self.parent = previous.version if previous else None
+        self.parent_versions = previous.versions if previous else {}
+        # Kept until the change is worked out, and only if its table was ever built
+        self._previous = previous if previous is not None and previous._table is not None else None
+        if previous is not None:
+            previous._previous = None  # superseded, so nothing will ask for its own change
+        self._table = None
+        self._change = None
+        self._lock = threading.Lock()
+        self._change_lock = threading.Lock()
+
+    def table(self):
+        with self._lock:
+            if self._table is None:
+                profiling.cache_miss("load_table")
+                self._table = build_table(self.paths)
+            return self._table
+
+    def changed_years(self):
+        """Years added, removed or edited since the previous snapshot."""
+        years = set(self.versions) | set(self.parent_versions)
+        return {year for year in years if self.versions.get(year) != self.parent_versions.get(year)}
+
+    def change(self):
+        """The ``DataChange`` from the previous snapshot, or ``None`` when its table was never loaded."""
+        with self._change_lock:
+            if self._change is None and self._previous is not None:
+                self._change = diff_tables(self._previous.table(), self.table(), self.changed_years())
+                self._previous = None  # the old table is no longer needed
+            return self._change
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_watched = threading.Event()
+
+
+def watched():
+    """
+    Called by ``happiness.refresh`` once it watches ``data/``: from then on
+    only ``advance()`` moves to a new snapshot, instead of every data access
+    comparing file times.
+    """
+    _watched.set()
+
+
+def advance():
+    """Ingest any change to ``data/`` and move to a new snapshot; return it, or ``None`` if the data is unchanged."""
+    global _snapshot
+    with _snapshot_lock:
+        current = _snapshot
+        signature = data_signature()
+        if current is not None and signature == current.signature:
+            return None
+        with profiling.timed("ingest", "load"):
+            paths = ingest()
+        new = Snapshot(signature, paths, current)
+        if current is not None and new.version == current.version:
+            current.signature = signature  # files touched or saved again with the same content
+            return None
+        _snapshot = new
+        return new
+
+
+def snapshot():
+    """The current snapshot of ``data/``."""
+    current = _snapshot
+    if current is None or not _watched.is_set() and data_signature() != current.signature:
+        advance()
+        current = _snapshot
+    return current
+
+
+def parquet_paths():
+    """Parquet file per year for the current contents of ``data/``."""
+    return snapshot().paths
+
+
+def data_version():
+    """Content hash of the current dataset, the same on every server reading the same files."""
+    return snapshot().version
+
+
+def year_version(year):
+    """Content version of one year's rows; unchanged by updates to other years' files."""
+    return snapshot().versions.get(year)
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _load_year(version, year):
+    profiling.cache_miss("load_year")
+    df = snapshot().table()
+    return df[df["Year"] == year].reset_index(drop=True)
+
+
+def load_data(year=None):
+    """
+    Return the long-format table for all years, or one year's rows.
+
+    Frames are cached by reference and shared by all sessions, so callers
+    must not modify them in place.
+    """
+    current = snapshot()
+    if year is None:
+        return profiling.cache_lookup("load_table", "load", current.table)
+    return profiling.cache_lookup("load_year", "load", _load_year, current.versions.get(year), year)
+
+
+def available_years():
+    # From the Parquet file list, so listing years never loads the table
+    return sorted(parquet_paths())
+
+
+_built = {}
+_built_lock = threading.Lock()
+
+
+def rebuild_by_group(name, build, df):
+    """
+    ``build(df)`` for the current snapshot's table ``df``, where ``build``
+    returns a table indexed by Year and Region first (the aggregate cube,
+    the regional statistics).
+
+    After an update only the (Year, Region) groups with changed rows are
+    built again; the rest are taken from the previous snapshot's result.
+    """
+    current = snapshot()
+    with _built_lock:
+        version, previous = _built.get(name, (None, None))
+    change = current.change() if version is not None and version == current.parent else None
+    if change is None:
+        table = build(df)
+    elif not change.groups:
+        table = previous
+    else:
+        groups = pd.MultiIndex.from_tuples(sorted(change.groups))
+        year_region = previous.index.droplevel(list(range(2, previous.index.nlevels)))
+        kept = previous[~year_region.isin(groups)]
+        rows = df[pd.MultiIndex.from_arrays([df["Year"], df["Region"].astype(str)]).isin(groups)]
+        table = pd.concat([kept, build(rows)]).sort_index() if len(rows) else kept
+    with _built_lock:
+        _built[name] = (current.version, table)
+    return table
@@ -0,0 +1,208 @@
+# ---------------------------
+# DuckDB Query Engine
+# ---------------------------
+"""
+Run ``happiness.query`` operations as SQL over the Parquet cache.
+
+With ``HAPPINESS_QUERY_ENGINE=duckdb`` the pages' queries never load the
+long-format table into pandas. Each ``Query`` becomes a SQL statement
+over the Parquet files in ``data/.cache``, and DuckDB scans only the
+columns and row groups it needs and returns the small result (a
+region's rows, a handful of means, one fit). Sessions then share
+nothing bigger than those results, and multi-year datasets stay on disk.
+
+DuckDB is optional (``pip install duckdb``); the default engine is the
+in-memory pandas one.
+"""
+
+import threading
+
+import numpy as np
+import streamlit as st
+
+from happiness.data import FACTORS, UNKNOWN_REGION, data_version, parquet_paths
+
+SCORE = "Happiness Score"
+RANK = "Happiness Rank"
+
+_local = threading.local()
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _database(version):
+    try:
+        import duckdb
+    except ModuleNotFoundError as exc:
+        raise ModuleNotFoundError(
+            "HAPPINESS_QUERY_ENGINE=duckdb needs DuckDB; run `pip install duckdb`"
+        ) from exc
+
+    files = ", ".join("'" + str(path).replace("'", "''") + "'" for path in parquet_paths().values())
+    db = duckdb.connect()
+    # Same table as happiness.data.load_data(): releases without a Region column
+    # take the country's region from the latest year that has one
+    db.execute(f"""
+        CREATE VIEW happiness AS
+        WITH raw AS (SELECT * FROM read_parquet([{files}], union_by_name = true)),
+        known AS (
+            SELECT Country, arg_max(Region, Year) FILTER (WHERE Region IS NOT NULL) AS region
+            FROM raw GROUP BY Country
+        )
+        SELECT raw.* REPLACE (COALESCE(raw.Region, known.region, '{UNKNOWN_REGION}') AS Region)
+        FROM raw LEFT JOIN known USING (Country)
+    """)
+    return db
+
+
+def _cursor():
+    """A cursor for this thread on the current data's database (DuckDB cursors are not shared)."""
+    db = _database(data_version())
+    if getattr(_local, "db", None) is not db:
+        _local.db, _local.cursor = db, db.cursor()
+    return _local.cursor
+
+
+def _where(query, extra=()):
+    clauses, params = list(extra), []
+    if query.year is not None:
+        clauses.append("Year = ?")
+        params.append(query.year)
+    if query.country is not None:
+        clauses.append("Country = ?")
+        params.append(query.country)
+    if query.region is not None:
+        clauses.append("Region = ?")
+        params.append(query.region)
+    if query.ranks is not None:
+        low, high = query.ranks
+        if low is not None:
+            clauses.append(f"{_quote(RANK)} >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append(f"{_quote(RANK)} <= ?")
+            params.append(high)
+    if query.min_score is not None:
+        clauses.append(f"{_quote(SCORE)} >= ?")
+        params.append(query.min_score)
+    if query.search:
+        clauses.append("contains(lower(Country), ?)")
+        params.append(query.search)
+    # DuckDB binds plain Python values only; years and bounds may arrive as numpy scalars
+    params = [value.item() if isinstance(value, np.generic) else value for value in params]
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _frame(sql, params):
+    return _cursor().execute(sql, params).df()
+
+
+# ---------------------------
+# Operations
+# ---------------------------
+def rows(query, order):
+    where, params = _where(query)
+    order_by = f"{_quote(SCORE)} DESC, {_quote(RANK)}" if order == "score" else f"Year, {_quote(RANK)}"
+    return _frame(f"SELECT * FROM happiness {where} ORDER BY {order_by}", params)
+
+
+def mean(query, measures):
+    where, params = _where(query)
+    columns = ", ".join(f"avg({_quote(m)}) AS {_quote(m)}" for m in measures)
+    result = _frame(f"SELECT {columns} FROM happiness {where}", params)
+    return result.iloc[0].astype(float)
+
+
+def mean_by_region(query, measure):
+    where, params = _where(query)
+    result = _frame(
+        f"SELECT Region, avg({_quote(measure)}) AS mean FROM happiness {where} GROUP BY Region ORDER BY Region",
+        params,
+    )
+    return result.set_index("Region")["mean"]
+
+
+def count_by_region(query):
+    where, params = _where(query)
+    result = _frame(
+        f"SELECT Region, count(*) AS count FROM happiness {where} GROUP BY Region ORDER BY count DESC, Region",
+        params,
+    )
+    return result.set_index("Region")["count"]
+
+
+def distinct(query, column):
+    where, params = _where(query)
+    result = _frame(f"SELECT DISTINCT CAST({_quote(column)} AS VARCHAR) AS v FROM happiness {where} ORDER BY v", params)
+    return result["v"].tolist()
+
+
+def bounds(query, column):
+    where, params = _where(query)
+    low, high = _cursor().execute(
+        f"SELECT min({_quote(column)}), max({_quote(column)}) FROM happiness {where}", params,
+    ).fetchone()
+    return low, high
+
+
+def fit(query, metric):
+    """Same fields as a ``happiness.stats.metric_stats`` row, for the query's rows."""
+    x, y = _quote(metric), _quote(SCORE)
+    where, params = _where(query, extra=[f"{x} IS NOT NULL", f"{y} IS NOT NULL"])
+    result = _frame(f"""
+        WITH pairs AS (SELECT {x} AS x, {y} AS y FROM happiness {where}),
+        ranked AS (
+            -- average ranks for ties, like pandas' rank()
+            SELECT x, y,
+                   rank() OVER (ORDER BY x) + (count(*) OVER (PARTITION BY x) - 1) / 2.0 AS rx,
+                   rank() OVER (ORDER BY y) + (count(*) OVER (PARTITION BY y) - 1) / 2.0 AS ry
+            FROM pairs
+        )
+        SELECT avg(x) AS mean, count(*) AS count,
+               regr_slope(y, x) AS slope, regr_intercept(y, x) AS intercept,
+               corr(x, y) AS pearson, corr(rx, ry) AS spearman,
+               count(DISTINCT x) AS levels
+        FROM ranked
+    """, params)
+    stats = result.iloc[0]
+    if stats["levels"] < 2:  # no trend line when the metric is constant, as in happiness.stats
+        stats[["slope", "intercept", "pearson", "spearman"]] = np.nan
+    return stats.drop("levels")
+
+
+def extremes(query):
+    """Same fields as a ``happiness.stats.region_extremes`` row, for the query's rows."""
+    where, params = _where(query)
+    s = _quote(SCORE)
+    result = _frame(f"""
+        SELECT arg_max(Country, {s}) AS top_country, max({s}) AS top_score,
+               arg_min(Country, {s}) AS bottom_country, min({s}) AS bottom_score,
+               max({s}) - min({s}) AS range, avg({s}) AS mean_score
+        FROM happiness {where}
+    """, params)
+    return result.iloc[0]
+
+
+def correlation(query, method):
+    where, params = _where(query)
+    columns = ", ".join(_quote(c) for c in [SCORE] + FACTORS)
+    return _frame(f"SELECT {columns} FROM happiness {where}", params).corr(method=method)
+
+
+OPERATIONS = {
+    "rows": rows, "mean": mean, "mean_by_region": mean_by_region, "count_by_region": count_by_region,
+    "distinct": distinct, "bounds": bounds, "fit": fit, "extremes": extremes, "correlation": correlation,
+}
+
+
+def execute(query, operation, args):
+    return OPERATIONS[operation](query, *args)
+
+
+def warm_up():
+    """Open the database and read the year list, so the first page query only scans."""
+    _cursor().execute("SELECT DISTINCT Year FROM happiness").fetchall()
+
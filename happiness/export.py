@@ -0,0 +1,304 @@
+# ---------------------------
+# Static Report Export
+# ---------------------------
+"""
+Render the chart pages for every year and region into a static report.
+
+Usage::
+
+    python -m happiness.export --out report          # HTML: report/index.html
+    python -m happiness.export --out report --pdf    # also report/report.pdf
+
+Covered: the Regional Filter (box plot per region, scatter per region x
+metric), the Global Summary and Top Trends (with the pages' default
+filters), for every year in ``data/``.
+
+The data is loaded once, and the aggregate cube and regional fit table
+are built once for all charts. The charts are rendered across a process
+pool (``--workers``, default one per CPU), so a full export scales with
+cores.
+
+``report/manifest.json`` records a fingerprint of each image's inputs
+(its data, options and the chart-builder code). A later export renders
+only the charts whose fingerprint changed, and rewrites the HTML (and
+PDF) only if an image or the set of images did. ``--years`` exports
+part of the report: the other years' images stay, and only years gone
+from ``data/`` are removed with them.
+"""
+
+import argparse
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from happiness import figures, settings
+from happiness.aggregates import build_cube, measure_means, region_means
+from happiness.data import FACTORS, load_data
+from happiness.render import render_png
+from happiness.result_cache import fingerprint
+from happiness.stats import build_metric_stats
+
+PAGES = {
+    "regional_filter": "Regional Filter",
+    "global_summary": "Global Summary",
+    "top_trends": "Top Trends",
+}
+
+# The pages' default widget values
+RANK_LIMIT = 50
+MIN_SCORE = 5.0
+
+
+class Chart:
+    """One image of the report: where it goes and how to draw it."""
+
+    def __init__(self, page, year, section, title, builder, *args, **kwargs):
+        self.page, self.year, self.section, self.title = page, year, section, title
+        self.builder, self.args, self.kwargs = builder, args, kwargs
+
+    @property
+    def path(self):
+        slug = re.sub(r"[^a-z0-9]+", "-", f"{self.section} {self.title}".lower()).strip("-")
+        return f"{self.page}/{self.year}/{slug}.png"
+
+    def key(self, code_version):
+        return fingerprint(code_version, self.builder.__name__, self.args, self.kwargs)
+
+
+def _code_version():
+    # Editing a chart builder changes every image it draws
+    return hashlib.sha256(Path(figures.__file__).read_bytes()).hexdigest()[:16]
+
+
+# ---------------------------
+# Charts per Page (same inputs as the pages, from shared aggregates)
+# ---------------------------
+def regional_filter_charts(df, metric_stats, year):
+    rows = df[df["Year"] == year]
+    for region in sorted(rows["Region"].astype(str).unique()):
+        region_df = rows[rows["Region"] == region].sort_values("Happiness Score", ascending=False)
+        region_df = region_df.astype({"Country": str})
+        yield Chart("regional_filter", year, region, "Score distribution",
+                    figures.score_boxplot, region_df["Happiness Score"])
+
+        for metric in FACTORS:
+            fit = metric_stats.loc[(year, region, metric)] if (year, region, metric) in metric_stats.index else None
+            trend = {}
+            if fit is not None and fit["slope"] == fit["slope"]:  # not NaN: the metric varies in the region
+                trend = {"slope": fit["slope"], "intercept": fit["intercept"], "corr": fit["pearson"]}
+            if len(region_df) > settings.SCATTER_MAX_POINTS:
+                yield Chart("regional_filter", year, region, f"{metric} vs Happiness Score",
+                            figures.metric_density, figures.density_grid(region_df, metric), metric, **trend)
+            else:
+                scatter_df = region_df[["Country", metric, "Happiness Score"]]
+                yield Chart("regional_filter", year, region, f"{metric} vs Happiness Score",
+                            figures.metric_scatter, scatter_df, metric, **trend)
+
+
+def global_summary_charts(df, cube, year):
+    section = "Regional averages"
+    bars = [
+        ("Happiness Score", False, "viridis", "Average Happiness Score by Region", "Score"),
+        ("Happiness Rank", True, "coolwarm", "Average Happiness Rank by Region (Lower is Better)", "Rank"),
+        ("Economy (GDP per Capita)", None, "plasma", "Average GDP per Capita by Region", "GDP per Capita"),
+        ("Health (Life Expectancy)", False, "rocket", "Average Life Expectancy by Region", "Life Expectancy"),
+        ("Freedom", False, "cubehelix", "Average Freedom Score by Region", "Freedom Score"),
+    ]
+    for measure, ascending, palette, title, xlabel in bars:
+        values = region_means(cube, year, measure)
+        if ascending is not None:
+            values = values.sort_values(ascending=ascending)
+        yield Chart("global_summary", year, section, title, figures.region_bar, values, palette, title, xlabel)
+
+    rows = df[df["Year"] == year]
+    top5 = rows.sort_values("Happiness Score", ascending=False).head(5)
+    yield Chart("global_summary", year, "Top countries", "Top 5 Happiest Countries",
+                figures.top_countries, top5[["Country", "Happiness Score"]].astype({"Country": str}))
+
+    counts = rows[rows["Happiness Rank"] <= RANK_LIMIT]["Region"].astype(str).value_counts()
+    counts.index.name = "Region"
+    yield Chart("global_summary", year, "Top countries", f"Regions of the top {RANK_LIMIT}",
+                figures.region_pie, counts[counts > 0])
+
+
+def top_trends_charts(df, cube, year):
+    section = f"Score at least {MIN_SCORE}"
+    rows = df[(df["Year"] == year) & (df["Happiness Score"] >= MIN_SCORE)]
+    top10 = rows.sort_values("Happiness Score", ascending=False).head(10)
+    yield Chart("top_trends", year, section, "Top 10 Happiest Countries",
+                figures.top10_bar, top10[["Country", "Happiness Score"]].astype({"Country": str}))
+    yield Chart("top_trends", year, section, "Average Factor Contributions",
+                figures.factor_bar, measure_means(cube, year, FACTORS, MIN_SCORE).sort_values(ascending=False))
+    yield Chart("top_trends", year, section, "Regional Happiness Trends",
+                figures.region_barh, region_means(cube, year, "Happiness Score", MIN_SCORE).sort_values(ascending=False))
+
+
+def plan(years=None):
+    """Every chart of the report, built from one load of the data."""
+    df = load_data()
+    cube, metric_stats = build_cube(df), build_metric_stats(df)
+    charts = []
+    for year in sorted(df["Year"].unique().tolist()):
+        if years and year not in years:
+            continue
+        charts += regional_filter_charts(df, metric_stats, year)
+        charts += global_summary_charts(df, cube, year)
+        charts += top_trends_charts(df, cube, year)
+    return charts
+
+
+# ---------------------------
+# Rendering & Output
+# ---------------------------
+def _year(path):
+    return int(path.split("/")[1])  # paths are page/year/slug.png
+
+
+def render(charts, out, workers, years=None):
+    """
+    Write the PNG of every chart of ``years`` (default: all) whose inputs changed.
+
+    ``charts`` is the plan for every year in ``data/``. Images that are no
+    longer planned are deleted for the exported years and for years gone
+    from ``data/``; other years' images and manifest entries are kept.
+    Returns how many were rendered, whether the report's set of images
+    changed, and the charts that now have an image.
+    """
+    manifest_path = out / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    version = _code_version()
+    exported = [chart for chart in charts if years is None or chart.year in years]
+    keys = {chart.path: chart.key(version) for chart in exported}
+    stale = [chart for chart in exported if manifest.get(chart.path) != keys[chart.path] or not (out / chart.path).exists()]
+
+    def save(chart, image):
+        target = out / chart.path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(image)
+
+    if workers > 1 and len(stale) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Workers get the builder and its inputs, which pickle by reference and value
+            futures = {pool.submit(render_png, chart.builder, *chart.args, **chart.kwargs): chart for chart in stale}
+            for future in as_completed(futures):
+                save(futures[future], future.result())
+    else:
+        for chart in stale:
+            save(chart, render_png(chart.builder, *chart.args, **chart.kwargs))
+
+    # Images of charts that no longer exist go too, within the exported years or a removed year
+    planned_years = {chart.year for chart in charts}
+    updated = {
+        path: key for path, key in manifest.items()
+        if path in keys or not (years is None or _year(path) in years or _year(path) not in planned_years)
+    }
+    for path in set(manifest) - set(updated):
+        (out / path).unlink(missing_ok=True)
+    updated.update(keys)
+    if updated != manifest:
+        manifest_path.write_text(json.dumps(updated, indent=2, sort_keys=True))
+    return len(stale), set(updated) != set(manifest), [chart for chart in charts if chart.path in updated]
+
+
+def write_html(charts, out):
+    """Write ``index.html`` and one page per page and year; remove pages left without charts."""
+    by_page = {}
+    for chart in charts:
+        by_page.setdefault((chart.page, chart.year), []).append(chart)
+
+    links = []
+    for (page, year), page_charts in sorted(by_page.items()):
+        name = f"{page}_{year}.html"
+        body, section = [], None
+        for chart in page_charts:
+            if chart.section != section:
+                section = chart.section
+                body.append(f"<h2>{html.escape(section)}</h2>")
+            body.append(
+                f'<figure><img src="{chart.path}" alt="{html.escape(chart.title)}" loading="lazy">'
+                f"<figcaption>{html.escape(chart.title)}</figcaption></figure>"
+            )
+        title = f"{PAGES[page]} {year}"
+        (out / name).write_text(_page(title, "\n".join(body)), encoding="utf-8")
+        links.append(f'<li><a href="{name}">{html.escape(title)}</a> ({len(page_charts)} charts)</li>')
+
+    written = {f"{page}_{year}.html" for page, year in by_page}
+    for old in out.glob("*_*.html"):
+        if old.name not in written and re.fullmatch(rf"({'|'.join(PAGES)})_\d+\.html", old.name):
+            old.unlink()
+
+    index = f"<p>Generated {time.strftime('%Y-%m-%d %H:%M')}.</p><ul>{''.join(links)}</ul>"
+    (out / "index.html").write_text(_page("World Happiness Report", index), encoding="utf-8")
+
+
+def _page(title, body):
+    return (
+        f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+        "<style>body{font-family:sans-serif;max-width:1100px;margin:auto}"
+        "figure{display:inline-block;width:48%;margin:0 1% 1em 0;vertical-align:top}"
+        "img{width:100%}</style></head>"
+        f"<body><p><a href='index.html'>Index</a></p><h1>{html.escape(title)}</h1>{body}</body></html>"
+    )
+
+
+def write_pdf(charts, out):
+    """One page per chart, in report order."""
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    from happiness.warmup import plt
+
+    with PdfPages(out / "report.pdf") as pdf:
+        for chart in charts:
+            image = plt.imread(io.BytesIO((out / chart.path).read_bytes()), format="png")
+            fig = plt.figure(figsize=(8.27, 11.69))  # A4 portrait
+            fig.suptitle(f"{PAGES[chart.page]} {chart.year} · {chart.section}\n{chart.title}", fontsize=11)
+            ax = fig.add_axes([0.05, 0.05, 0.9, 0.82])
+            ax.imshow(image)
+            ax.axis("off")
+            pdf.savefig(fig)
+            plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--out", type=Path, default=Path("report"), help="output folder")
+    parser.add_argument("--years", type=int, nargs="+", help="render only these years, keeping the others' images (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render processes")
+    parser.add_argument("--pdf", action="store_true", help="also write report.pdf")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # Every year is planned (which is cheap next to rendering) so the pages can list them all
+    charts = plan()
+    planned = time.perf_counter()
+    args.out.mkdir(parents=True, exist_ok=True)
+    years = set(args.years) if args.years else None
+    rendered, changed, reported = render(charts, args.out, args.workers, years)
+    exported = sum(1 for chart in charts if years is None or chart.year in years)
+    # The pages link every image, so they change when an image does or the set of images does
+    if rendered or changed or not (args.out / "index.html").exists():
+        write_html(reported, args.out)
+    if args.pdf and (rendered or changed or not (args.out / "report.pdf").exists()):
+        write_pdf(reported, args.out)
+
+    print(
+        f"{exported} charts, {rendered} rendered, {exported - rendered} unchanged "
+        f"(plan {planned - start:.1f}s, total {time.perf_counter() - start:.1f}s) -> {args.out / 'index.html'}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
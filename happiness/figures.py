@@ -0,0 +1,182 @@
+# ---------------------------
+# Chart Builders
+# ---------------------------
+"""
+Matplotlib/seaborn charts used by the pages.
+
+Every builder is a plain function of its inputs that returns a new
+figure, so ``happiness.render`` can key the rendered image on those
+inputs and skip the drawing when they have not changed.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Imported on first use, so loading a page does not pull in matplotlib/seaborn
+from happiness.warmup import plt, sns
+
+
+# ===========================
+# Page 1: Country Explorer
+# ===========================
+def country_factors(country, country_values, global_avg):
+    """Bar chart of a country's factors, coloured by whether they beat the global average."""
+    diff = country_values - global_avg
+
+    fig1, ax1 = plt.subplots(figsize=(6, 4))
+    bar_colors = ["#2a9d8f" if d >= 0 else "#e76f51" for d in diff]
+
+    ax1.bar(country_values.index, country_values, color=bar_colors, edgecolor="black")
+    ax1.axhline(global_avg.mean(), color='gray', linestyle='--', linewidth=1)
+    ax1.set_ylabel("Score")
+    ax1.set_title(f"{country} vs Global Factor Averages", fontsize=12)
+    ax1.tick_params(axis='x', rotation=45)
+    ax1.grid(axis='y', linestyle='--', alpha=0.6)
+    return fig1
+
+
+# ===========================
+# Page 2: Regional Filter
+# ===========================
+def score_boxplot(scores):
+    """Box plot of a region's Happiness Scores with the mean marked."""
+    fig1, ax1 = plt.subplots(figsize=(6, 4))
+    sns.boxplot(y=scores, color="#48cae4", ax=ax1)
+
+    mean_score = scores.mean()
+    ax1.axhline(mean_score, color="red", linestyle="--", label=f"Mean: {mean_score:.2f}")
+    ax1.set_title("Box Plot of Happiness Scores")
+    ax1.set_ylabel("Happiness Score")
+    ax1.legend()
+    return fig1
+
+
+def metric_scatter(region_df, metric, slope=None, intercept=None, corr=None):
+    """Scatter of ``metric`` against Happiness Score, with the trend line when one was fitted."""
+    fig2, ax2 = plt.subplots(figsize=(6, 4))
+    sns.scatterplot(
+        data=region_df,
+        x=metric,
+        y="Happiness Score",
+        hue="Country",
+        palette="viridis",
+        s=90,
+        ax=ax2,
+        legend=False
+    )
+
+    if slope is not None:
+        _trend_line(ax2, region_df[metric].min(), region_df[metric].max(), slope, intercept, corr)
+
+    ax2.set_title(f"Happiness vs {metric}")
+    ax2.set_xlabel(metric)
+    ax2.set_ylabel("Happiness Score")
+    ax2.grid(True)
+    return fig2
+
+
+def density_grid(region_df, metric, bins=60):
+    """
+    Point counts of ``metric`` against Happiness Score on a ``bins`` x ``bins`` grid.
+
+    Rows are Happiness Score bin centres and columns ``metric`` bin centres,
+    so the grid (and drawing it) costs the same however many points went in.
+    """
+    points = region_df[[metric, "Happiness Score"]].dropna()
+    counts, x_edges, y_edges = np.histogram2d(points[metric], points["Happiness Score"], bins=bins)
+    return pd.DataFrame(
+        counts.T,
+        index=pd.Index((y_edges[:-1] + y_edges[1:]) / 2, name="Happiness Score"),
+        columns=pd.Index((x_edges[:-1] + x_edges[1:]) / 2, name=metric),
+    )
+
+
+def metric_density(grid, metric, slope=None, intercept=None, corr=None):
+    """Binned version of ``metric_scatter`` for regions with too many points to draw one by one."""
+    fig2, ax2 = plt.subplots(figsize=(6, 4))
+    x, y = grid.columns.to_numpy(), grid.index.to_numpy()
+    x_step = (x[1] - x[0]) if len(x) > 1 else 1.0
+    y_step = (y[1] - y[0]) if len(y) > 1 else 1.0
+    x_edges = np.append(x - x_step / 2, x[-1] + x_step / 2)
+    y_edges = np.append(y - y_step / 2, y[-1] + y_step / 2)
+
+    counts = np.ma.masked_equal(grid.to_numpy(), 0)  # empty bins stay blank
+    mesh = ax2.pcolormesh(x_edges, y_edges, counts, cmap="viridis", norm="log")
+    fig2.colorbar(mesh, ax=ax2, label="Points")
+
+    if slope is not None:
+        _trend_line(ax2, x_edges[0], x_edges[-1], slope, intercept, corr)
+
+    ax2.set_title(f"Happiness vs {metric} ({int(counts.sum()):,} points)")
+    ax2.set_xlabel(metric)
+    ax2.set_ylabel("Happiness Score")
+    ax2.grid(True)
+    return fig2
+
+
+def _trend_line(ax, x_min, x_max, slope, intercept, corr):
+    # A straight line only needs its two ends, however many points were fitted
+    x = np.array([x_min, x_max])
+    ax.plot(x, slope * x + intercept, color='black', linestyle='--', label='Trend Line')
+    ax.legend(title=f"Corr: {corr:.2f}")
+
+
+# ===========================
+# Page 3: Global Summary
+# ===========================
+def region_bar(values, palette, title, xlabel, figsize=(10, 5)):
+    """Horizontal bar per region, in the order of ``values``."""
+    fig, ax = plt.subplots(figsize=figsize)
+    sns.barplot(x=values.values, y=values.index, palette=palette, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("Region")
+    return fig
+
+
+def top_countries(top):
+    """Bar chart of the happiest countries in ``top``."""
+    fig6, ax6 = plt.subplots(figsize=(8, 5))
+    sns.barplot(x='Happiness Score', y='Country', data=top, palette='crest', ax=ax6)
+    ax6.set_title("Top 5 Happiest Countries")
+    return fig6
+
+
+def region_pie(region_counts):
+    """Pie chart of how many countries each region contributes."""
+    fig_pie, ax_pie = plt.subplots()
+    ax_pie.pie(region_counts, labels=region_counts.index, autopct='%1.1f%%', startangle=140)
+    ax_pie.axis('equal')  # Equal aspect ratio ensures a circular pie chart
+    return fig_pie
+
+
+# ===========================
+# Page 4: Top Trends
+# ===========================
+def top10_bar(top10, score="Happiness Score"):
+    """Bar chart of the ten best countries left by the filters, by ``score`` (e.g. a what-if score)."""
+    fig1, ax1 = plt.subplots(figsize=(10, 5))
+    sns.barplot(x=score, y="Country", data=top10, hue="Country", palette="viridis", ax=ax1, legend=False)
+    if score == "Happiness Score":
+        ax1.set_title("Top 10 Happiest Countries (Filtered)")
+    else:
+        ax1.set_title(f"Top 10 Countries by {score} (Filtered)")
+    return fig1
+
+
+def factor_bar(avg_factors):
+    """Bar chart of the mean of each factor."""
+    fig2, ax2 = plt.subplots(figsize=(10, 5))
+    avg_factors.plot(kind='bar', color='skyblue', ax=ax2, edgecolor="black")
+    ax2.set_title("Average Contribution of Each Factor to Happiness")
+    ax2.set_ylabel("Score")
+    return fig2
+
+
+def region_barh(region_avg):
+    """Horizontal bar chart of the mean Happiness Score per region."""
+    fig3, ax3 = plt.subplots(figsize=(10, 6))
+    region_avg.plot(kind="barh", color="coral", ax=ax3)
+    ax3.set_title("Average Happiness Score by Region (Filtered)")
+    ax3.set_xlabel("Average Score")
+    return fig3
@@ -0,0 +1,68 @@
+# ---------------------------
+# Sorted Indexes
+# ---------------------------
+"""
+Rank- and score-sorted copies of each year's table.
+
+Range filters such as "rank between 1 and 20" or "score at least 5.0"
+become two binary searches on the sorted key column followed by a
+positional slice, instead of a boolean mask over every row.
+"""
+
+import numpy as np
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import load_data, year_version
+
+
+class SortedIndex:
+    """The rows of a frame sorted on ``column``, with range lookups by binary search."""
+
+    def __init__(self, df, column, ascending=True):
+        self.column = column
+        self.ascending = ascending
+        self.rows = df.sort_values(column, ascending=ascending, kind="stable", ignore_index=True)
+        keys = self.rows[column].to_numpy()
+        # searchsorted needs ascending keys, so descending indexes search on the negated column
+        self._keys = keys if ascending else -keys
+
+    def _position(self, value, side):
+        key = value if self.ascending else -value
+        return int(np.searchsorted(self._keys, key, side=side))
+
+    def between(self, low=None, high=None):
+        """Rows with ``low <= column <= high`` (either bound optional), in index order."""
+        if not self.ascending:
+            low, high = high, low
+        start = 0 if low is None else self._position(low, "left")
+        stop = len(self._keys) if high is None else self._position(high, "right")
+        return self.rows.iloc[start:stop]
+
+    def at_least(self, low):
+        return self.between(low=low)
+
+    def at_most(self, high):
+        return self.between(high=high)
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _rank_index(version, year):
+    profiling.cache_miss("rank_index")
+    return SortedIndex(load_data(year), "Happiness Rank")
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _score_index(version, year):
+    profiling.cache_miss("score_index")
+    return SortedIndex(load_data(year), "Happiness Score", ascending=False)
+
+
+def rank_index(year):
+    """``year``'s rows by ascending Happiness Rank, shared by all sessions."""
+    return profiling.cache_lookup("rank_index", "filter", _rank_index, year_version(year), year)
+
+
+def score_index(year):
+    """``year``'s rows by descending Happiness Score, shared by all sessions."""
+    return profiling.cache_lookup("score_index", "filter", _score_index, year_version(year), year)
@@ -0,0 +1,82 @@
+# ---------------------------
+# Top Trends Filter Pipeline
+# ---------------------------
+"""
+Score -> region -> country-search filtering with each stage memoized.
+
+Every stage is cached on its own inputs, so typing in the country search
+box reuses the score+region result and only runs the search stage. The
+search itself goes through a trigram index over the lower-cased country
+names instead of a regex over the whole column.
+"""
+
+from collections import defaultdict
+
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import data_version, load_data, year_version
+from happiness.indexes import score_index
+
+
+class CountrySearch:
+    """Case-insensitive substring search over country names, backed by a trigram index."""
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        self.lowered = [name.lower() for name in self.names]
+        self.trigrams = defaultdict(set)
+        for i, name in enumerate(self.lowered):
+            for j in range(len(name) - 2):
+                self.trigrams[name[j:j + 3]].add(i)
+
+    def matches(self, text):
+        """Names containing ``text`` (already stripped and lower-cased)."""
+        if len(text) < 3:
+            candidates = range(len(self.names))
+        else:
+            postings = [self.trigrams.get(text[j:j + 3], set()) for j in range(len(text) - 2)]
+            candidates = set.intersection(*sorted(postings, key=len))
+        # Trigrams narrow the candidates; the substring check confirms the order
+        return [self.names[i] for i in candidates if text in self.lowered[i]]
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _country_search(version):
+    return CountrySearch(load_data()["Country"].astype(str))
+
+
+def country_search():
+    return _country_search(data_version())
+
+
+# ---------------------------
+# Memoized Stages
+# ---------------------------
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _by_region(version, year, min_score, region):
+    profiling.cache_miss("filter_region")
+    rows = score_index(year).at_least(min_score)
+    if region is not None:
+        rows = rows[rows["Region"] == region]
+    return rows
+
+
+@st.cache_resource(show_spinner=False, max_entries=512)
+def _by_country(version, year, min_score, region, text):
+    profiling.cache_miss("filter_country")
+    rows = _by_region(version, year, min_score, region)
+    return rows[rows["Country"].isin(country_search().matches(text))]
+
+
+def filter_rows(year, min_score, region=None, text=""):
+    """
+    ``year``'s rows scoring at least ``min_score``, optionally limited to one
+    region and to countries whose name contains ``text``, by descending score.
+    """
+    version = year_version(year)  # other years' updates keep these stages
+    if text:
+        return profiling.cache_lookup(
+            "filter_country", "filter", _by_country, version, year, min_score, region, text,
+        )
+    return profiling.cache_lookup("filter_region", "filter", _by_region, version, year, min_score, region)
@@ -0,0 +1,143 @@
+# ---------------------------
+# Plotly Charts (Country Explorer)
+# ---------------------------
+"""
+Choropleth and treemap figures with small, stable payloads.
+
+Plotly's ``locationmode="country names"`` makes the browser match every
+country name against its geometry table on each render. Mapping names to
+ISO-3 codes on the server lets the map use plain code lookups instead.
+The styled base choropleth is built once per process and each year's map
+only adds its trace. Finished figures are cached, so a rerun with the
+same inputs sends the same figure spec. Plotly itself is imported on
+first use.
+"""
+
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import year_version
+from happiness.query import Query
+
+# Report country names (2015 spelling, see happiness.data.COUNTRY_ALIASES) to ISO 3166-1 alpha-3.
+# Territories without an ISO code (North Cyprus, Somaliland region) are left off the map.
+COUNTRY_ISO3 = {
+    "Afghanistan": "AFG", "Albania": "ALB", "Algeria": "DZA", "Angola": "AGO",
+    "Argentina": "ARG", "Armenia": "ARM", "Australia": "AUS", "Austria": "AUT",
+    "Azerbaijan": "AZE", "Bahrain": "BHR", "Bangladesh": "BGD", "Belarus": "BLR",
+    "Belgium": "BEL", "Belize": "BLZ", "Benin": "BEN", "Bhutan": "BTN",
+    "Bolivia": "BOL", "Bosnia and Herzegovina": "BIH", "Botswana": "BWA", "Brazil": "BRA",
+    "Bulgaria": "BGR", "Burkina Faso": "BFA", "Burundi": "BDI", "Cambodia": "KHM",
+    "Cameroon": "CMR", "Canada": "CAN", "Central African Republic": "CAF", "Chad": "TCD",
+    "Chile": "CHL", "China": "CHN", "Colombia": "COL", "Comoros": "COM",
+    "Congo (Brazzaville)": "COG", "Congo (Kinshasa)": "COD", "Costa Rica": "CRI", "Croatia": "HRV",
+    "Cyprus": "CYP", "Czech Republic": "CZE", "Denmark": "DNK", "Djibouti": "DJI",
+    "Dominican Republic": "DOM", "Ecuador": "ECU", "Egypt": "EGY", "El Salvador": "SLV",
+    "Estonia": "EST", "Ethiopia": "ETH", "Finland": "FIN", "France": "FRA",
+    "Gabon": "GAB", "Gambia": "GMB", "Georgia": "GEO", "Germany": "DEU",
+    "Ghana": "GHA", "Greece": "GRC", "Guatemala": "GTM", "Guinea": "GIN",
+    "Haiti": "HTI", "Honduras": "HND", "Hong Kong": "HKG", "Hungary": "HUN",
+    "Iceland": "ISL", "India": "IND", "Indonesia": "IDN", "Iran": "IRN",
+    "Iraq": "IRQ", "Ireland": "IRL", "Israel": "ISR", "Italy": "ITA",
+    "Ivory Coast": "CIV", "Jamaica": "JAM", "Japan": "JPN", "Jordan": "JOR",
+    "Kazakhstan": "KAZ", "Kenya": "KEN", "Kosovo": "XKX", "Kuwait": "KWT",
+    "Kyrgyzstan": "KGZ", "Laos": "LAO", "Latvia": "LVA", "Lebanon": "LBN",
+    "Lesotho": "LSO", "Liberia": "LBR", "Libya": "LBY", "Lithuania": "LTU",
+    "Luxembourg": "LUX", "Macedonia": "MKD", "Madagascar": "MDG", "Malawi": "MWI",
+    "Malaysia": "MYS", "Mali": "MLI", "Malta": "MLT", "Mauritania": "MRT",
+    "Mauritius": "MUS", "Mexico": "MEX", "Moldova": "MDA", "Mongolia": "MNG",
+    "Montenegro": "MNE", "Morocco": "MAR", "Mozambique": "MOZ", "Myanmar": "MMR",
+    "Namibia": "NAM", "Nepal": "NPL", "Netherlands": "NLD", "New Zealand": "NZL",
+    "Nicaragua": "NIC", "Niger": "NER", "Nigeria": "NGA", "Norway": "NOR",
+    "Oman": "OMN", "Pakistan": "PAK", "Palestinian Territories": "PSE", "Panama": "PAN",
+    "Paraguay": "PRY", "Peru": "PER", "Philippines": "PHL", "Poland": "POL",
+    "Portugal": "PRT", "Puerto Rico": "PRI", "Qatar": "QAT", "Romania": "ROU",
+    "Russia": "RUS", "Rwanda": "RWA", "Saudi Arabia": "SAU", "Senegal": "SEN",
+    "Serbia": "SRB", "Sierra Leone": "SLE", "Singapore": "SGP", "Slovakia": "SVK",
+    "Slovenia": "SVN", "Somalia": "SOM", "South Africa": "ZAF", "South Korea": "KOR",
+    "South Sudan": "SSD", "Spain": "ESP", "Sri Lanka": "LKA", "Sudan": "SDN",
+    "Suriname": "SUR", "Swaziland": "SWZ", "Sweden": "SWE", "Switzerland": "CHE",
+    "Syria": "SYR", "Taiwan": "TWN", "Tajikistan": "TJK", "Tanzania": "TZA",
+    "Thailand": "THA", "Togo": "TGO", "Trinidad and Tobago": "TTO", "Tunisia": "TUN",
+    "Turkey": "TUR", "Turkmenistan": "TKM", "Uganda": "UGA", "Ukraine": "UKR",
+    "United Arab Emirates": "ARE", "United Kingdom": "GBR", "United States": "USA", "Uruguay": "URY",
+    "Uzbekistan": "UZB", "Venezuela": "VEN", "Vietnam": "VNM", "Yemen": "YEM",
+    "Zambia": "ZMB", "Zimbabwe": "ZWE",
+}
+
+
+# ===========================
+# Choropleth
+# ===========================
+@st.cache_resource(show_spinner=False)
+def base_choropleth():
+    """Layout and colour axis shared by every year's map, built once per process."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.update_layout(
+        coloraxis=dict(colorscale="YlGnBu", colorbar=dict(title="Happiness Score")),
+        geo=dict(showframe=False, projection_type="equirectangular"),
+        margin={"r": 50, "t": 30, "l": 0, "b": 0},
+    )
+    return fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _choropleth(version, year):
+    import plotly.graph_objects as go
+
+    profiling.cache_miss("choropleth")
+    df = Query(year).rows()
+    codes = df["Country"].astype(str).map(COUNTRY_ISO3)
+    mapped = df[codes.notna()]
+
+    fig = go.Figure(base_choropleth())
+    fig.add_trace(go.Choropleth(
+        locations=codes[codes.notna()].tolist(),
+        locationmode="ISO-3",
+        z=mapped["Happiness Score"].round(3).tolist(),
+        text=mapped["Country"].astype(str).tolist(),
+        coloraxis="coloraxis",
+        hovertemplate="<b>%{text}</b><br>Happiness Score=%{z}<extra></extra>",
+    ))
+    fig.update_layout(title=f"Global Happiness Distribution ({year})")
+    return fig
+
+
+def choropleth(year):
+    """World map of ``year``'s Happiness Scores, cached per year and shared by all sessions."""
+    return profiling.cache_lookup("choropleth", "render", _choropleth, year_version(year), year)
+
+
+# ===========================
+# Treemap
+# ===========================
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _treemap(version, year, low, high):
+    import plotly.graph_objects as go
+
+    profiling.cache_miss("treemap")
+    rows = Query(year, ranks=(low, high)).rows()
+    scores = rows["Happiness Score"].round(3).tolist()
+
+    fig = go.Figure(go.Treemap(
+        labels=rows["Country"].astype(str).tolist(),
+        parents=[""] * len(rows),
+        values=scores,
+        marker=dict(colors=scores, colorscale="Tealgrn", showscale=True,
+                    colorbar=dict(title="Happiness Score")),
+        texttemplate="%{label}<br>%{value:.2f}",
+        hovertemplate="<b>%{label}</b><br>Happiness Score=%{value:.2f}<extra></extra>",
+    ))
+    fig.update_layout(
+        title="Tree Map of Happiness Scores by Country",
+        margin=dict(t=60, l=10, r=10, b=10),
+        title_font_size=20,
+    )
+    return fig
+
+
+def treemap(year, rank_range):
+    """Treemap of the countries ranked within ``rank_range``, cached per range."""
+    return profiling.cache_lookup("treemap", "render", _treemap, year_version(year), year, rank_range[0], rank_range[1])
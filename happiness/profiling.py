@@ -0,0 +1,235 @@
+# ---------------------------
+# Rerun Profiling
+# ---------------------------
+"""
+Opt-in timing of every data load, filter, aggregation and chart render.
+
+Enable it for the whole server with ``HAPPINESS_PROFILE=1`` or for one
+browser tab by adding ``?profile=1`` to the URL. Each page calls
+``begin(page)`` at the top and ``finish()`` at the bottom, and each page
+fragment wraps its body in ``fragment(name)`` so reruns of just that
+fragment are profiled on their own. In between, the shared modules record:
+
+- ``timed(step, category)``: wall time of a step
+- ``cache_lookup`` / ``cache_miss``: hits and misses of the shared caches
+- bytes of every element Streamlit sends to the browser, by element type
+  (``count_bytes`` adds image files, which are fetched separately)
+
+``finish()`` shows the numbers in a sidebar panel (inline for a fragment
+rerun, which cannot write to the sidebar) and, when
+``HAPPINESS_PROFILE_LOG`` is set, appends them to that file as one JSON
+line per rerun. When profiling is off every hook returns immediately.
+"""
+
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import streamlit as st
+
+from happiness import settings
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class RerunProfile:
+    """Everything recorded during one script run of one page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.steps = defaultdict(lambda: {"category": "", "calls": 0, "seconds": 0.0})
+        self.hits = Counter()
+        self.misses = Counter()
+        self.sent = Counter()
+        self.missed = set()
+
+    def add(self, step, category, seconds):
+        entry = self.steps[step]
+        entry["category"] = category
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+
+    def to_dict(self):
+        return {
+            "page": self.page,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "steps": {
+                step: {**entry, "seconds": round(entry["seconds"], 6)}
+                for step, entry in self.steps.items()
+            },
+            "cache_hits": dict(self.hits),
+            "cache_misses": dict(self.misses),
+            "bytes_sent": dict(self.sent),
+        }
+
+
+def _current():
+    return getattr(_local, "profile", None)
+
+
+def _requested():
+    if settings.PROFILE:
+        return True
+    try:
+        return st.query_params.get("profile") == "1"
+    except Exception:  # no script run context, e.g. when imported by a tool
+        return False
+
+
+# ---------------------------
+# Recording Hooks
+# ---------------------------
+@contextmanager
+def timed(step, category):
+    profile = _current()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(step, category, time.perf_counter() - start)
+
+
+def record(step, category, seconds):
+    """Add a duration measured elsewhere, e.g. in a render worker."""
+    profile = _current()
+    if profile is not None:
+        profile.add(step, category, seconds)
+
+
+def count_cache(name, hit):
+    profile = _current()
+    if profile is not None:
+        (profile.hits if hit else profile.misses)[name] += 1
+
+
+def cache_miss(name):
+    """Call inside a cached function body: marks the surrounding ``cache_lookup`` as a miss."""
+    profile = _current()
+    if profile is not None:
+        profile.missed.add(name)
+
+
+def cache_lookup(name, category, fn, *args):
+    """Call the ``st.cache_resource`` function ``fn``, timing it and counting hit or miss."""
+    profile = _current()
+    if profile is None:
+        return fn(*args)
+    profile.missed.discard(name)
+    with timed(name, category):
+        result = fn(*args)
+    count_cache(name, hit=name not in profile.missed)
+    return result
+
+
+def count_bytes(kind, nbytes):
+    """Add payload Streamlit serves outside the delta messages, e.g. image files."""
+    profile = _current()
+    if profile is not None:
+        profile.sent[kind] += nbytes
+
+
+def _watch_sent_bytes():
+    """Wrap this session's message queue once so element sizes reach the current profile."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        enqueue = ctx._enqueue
+    except Exception:  # private API moved; profiling still works without byte counts
+        return
+    if getattr(enqueue, "_happiness_profiled", False):
+        return
+
+    def counting_enqueue(msg):
+        profile = _current()
+        if profile is not None and msg.HasField("delta"):
+            delta = msg.delta
+            kind = delta.new_element.WhichOneof("type") if delta.HasField("new_element") else delta.WhichOneof("type")
+            profile.sent[kind or "other"] += msg.ByteSize()
+        return enqueue(msg)
+
+    counting_enqueue._happiness_profiled = True
+    ctx._enqueue = counting_enqueue
+
+
+# ---------------------------
+# Page Hooks
+# ---------------------------
+def begin(page):
+    """Start profiling this rerun of ``page`` if profiling was requested."""
+    _local.profile = RerunProfile(page) if _requested() else None
+    if _local.profile is not None:
+        _watch_sent_bytes()
+
+
+@contextmanager
+def fragment(name):
+    """Profile a fragment's own reruns as ``name``; in a full rerun it is part of the page's profile."""
+    if not _fragment_rerun():
+        yield
+        return
+    begin(name)
+    try:
+        yield
+    finally:
+        finish()
+
+
+def _fragment_rerun():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        return bool(get_script_run_ctx().fragment_ids_this_run)
+    except Exception:  # no script run context, or an older Streamlit without fragments
+        return False
+
+
+def finish():
+    """Show this rerun's profile in the sidebar and append it to the JSON-lines log."""
+    profile = _current()
+    _local.profile = None
+    if profile is None:
+        return
+
+    report = profile.to_dict()
+    if settings.PROFILE_LOG:
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+            report["session"] = get_script_run_ctx().session_id
+        except Exception:
+            report["session"] = None
+        report["time"] = time.time()
+        with _log_lock, open(settings.PROFILE_LOG, "a", encoding="utf-8") as log:
+            log.write(json.dumps(report) + "\n")
+
+    if _fragment_rerun():
+        panel = st.expander(f"🛠️ Profiling (this rerun of {report['page']})", expanded=False)
+    else:
+        panel = st.sidebar.expander("🛠️ Profiling (this rerun)", expanded=False)
+    with panel:
+        st.metric("Rerun time", f"{report['total_ms']:.0f} ms")
+        steps = sorted(report["steps"].items(), key=lambda item: -item[1]["seconds"])
+        st.dataframe(
+            [{"step": step, "category": entry["category"], "calls": entry["calls"],
+              "ms": round(entry["seconds"] * 1000, 1)} for step, entry in steps],
+            hide_index=True, use_container_width=True,
+        )
+        caches = sorted(set(report["cache_hits"]) | set(report["cache_misses"]))
+        st.dataframe(
+            [{"cache": name, "hits": report["cache_hits"].get(name, 0),
+              "misses": report["cache_misses"].get(name, 0)} for name in caches],
+            hide_index=True, use_container_width=True,
+        )
+        st.dataframe(
+            [{"element": kind, "kB": round(size / 1024, 1)}
+             for kind, size in sorted(report["bytes_sent"].items(), key=lambda item: -item[1])],
+            hide_index=True, use_container_width=True,
+        )
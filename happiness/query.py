@@ -0,0 +1,308 @@
+# ---------------------------
+# Query Engine
+# ---------------------------
+"""
+One place where the pages' filters and aggregates are planned and run.
+
+A ``Query`` describes which rows a page wants: a year plus any of a
+country, a region, a rank range, a minimum score and a country-name
+search. Pages ask it for rows, means, counts or the regional statistics
+and the planner decides how to answer:
+
+- rows come from the cheapest access path (country lookup, trigram
+  search, score index, rank index or the year's table); filters the path
+  does not cover are applied as masks over the rows it returns
+- means and counts come from the aggregate cube when the filters are
+  ones the cube is bucketed on (region, and a score threshold on a bucket
+  edge), otherwise from the matching rows
+- fits, extremes and correlations come from the precomputed tables in
+  ``happiness.stats`` when only a region is selected
+
+With ``HAPPINESS_QUERY_ENGINE=duckdb`` every operation is instead run as
+SQL over the Parquet cache by ``happiness.duckdb_engine``.
+
+``Query(2019).where(region="Western Europe").explain("mean")`` names the
+plan. Results are memoized per query for all sessions and, like the
+frames they come from, must not be modified in place.
+"""
+
+import numpy as np
+import streamlit as st
+
+from happiness import profiling, settings
+from happiness.aggregates import BUCKET_WIDTH, MEASURES, load_cube, measure_means, region_summary
+from happiness.data import FACTORS, data_version, load_data, year_version
+from happiness.indexes import rank_index
+from happiness.pipeline import filter_rows
+from happiness.stats import (
+    build_metric_stats, build_region_extremes, correlation_matrix, metric_stats, region_extremes,
+)
+
+SCORE = "Happiness Score"
+RANK = "Happiness Rank"
+
+# Filters each access path answers by itself; the rest become masks
+COVERS = {
+    "country index": {"country"},
+    "trigram search": {"search", "min_score", "region"},
+    "score index": {"min_score", "region"},
+    "rank index": {"ranks"},
+    "table": set(),
+}
+
+# Order in which each access path returns its rows
+ORDER = {
+    "country index": "rank",
+    "trigram search": "score",
+    "score index": "score",
+    "rank index": "rank",
+    "table": "rank",
+}
+
+
+class Query:
+    """
+    Filter over one year's rows (``year=None`` scans every year).
+
+    ``ranks`` is an inclusive ``(low, high)`` pair where either end may be
+    ``None``; ``search`` matches country names case-insensitively.
+    """
+
+    FIELDS = ("year", "country", "region", "ranks", "min_score", "search")
+
+    def __init__(self, year=None, country=None, region=None, ranks=None, min_score=None, search=""):
+        self.year = year
+        self.country = country
+        self.region = region
+        self.ranks = tuple(ranks) if ranks is not None else None
+        self.min_score = min_score
+        self.search = search.strip().lower() if search else ""
+
+    @property
+    def key(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def where(self, **filters):
+        """A copy of this query with ``filters`` added or replaced."""
+        unknown = set(filters) - set(self.FIELDS)
+        if unknown:
+            raise TypeError(f"unknown query filter(s): {', '.join(sorted(unknown))}")
+        return Query(**{**dict(zip(self.FIELDS, self.key)), **filters})
+
+    def __repr__(self):
+        set_filters = ", ".join(f"{f}={v!r}" for f, v in zip(self.FIELDS, self.key) if v not in (None, ""))
+        return f"Query({set_filters})"
+
+    # ---------------------------
+    # Planner
+    # ---------------------------
+    def _filters(self):
+        return {f for f in ("country", "region", "ranks", "min_score", "search") if getattr(self, f) not in (None, "")}
+
+    def access_path(self):
+        """How rows are found: an index or search structure, or the year's table."""
+        if self.year is None:
+            return "table"
+        if self.country is not None:
+            return "country index"
+        if self.search:
+            return "trigram search"
+        if self.min_score is not None or (self.region is not None and self.ranks is None):
+            return "score index"
+        if self.ranks is not None:
+            return "rank index"
+        return "table"
+
+    def uses_cube(self, measures=()):
+        """Whether aggregates can be read from the cube instead of the rows."""
+        return (
+            self.year is not None
+            and self._filters() <= {"min_score", "region"}
+            and all(measure in MEASURES for measure in measures)
+            and (self.min_score is None or _on_bucket_edge(self.min_score))
+        )
+
+    def uses_stats_tables(self):
+        return self.year is not None and self._filters() <= {"region"}
+
+    def explain(self, operation="rows"):
+        """Describe how ``operation`` would run, e.g. ``"score index + scan(ranks)"``."""
+        if settings.QUERY_ENGINE == "duckdb":
+            return f"duckdb {operation} over parquet"
+        if operation in ("mean", "mean_by_region", "count_by_region") and self.uses_cube():
+            return "aggregate cube"
+        if operation in ("fit", "extremes", "correlation") and self.uses_stats_tables():
+            return "precomputed statistics"
+        path = self.access_path()
+        residual = sorted(self._filters() - COVERS[path])
+        plan = f"{path} + scan({', '.join(residual)})" if residual else path
+        return plan if operation == "rows" else f"{operation} over {plan}"
+
+    # ---------------------------
+    # Execution (memoized per query)
+    # ---------------------------
+    def _run(self, operation, *args):
+        # A year's results depend on that year's rows only, so updates to other years keep them
+        version = data_version() if self.year is None else year_version(self.year)
+        return profiling.cache_lookup("query", "filter", _execute, version, self.key, operation, args)
+
+    def rows(self, order="rank", limit=None):
+        """Matching rows by ascending rank (``order="rank"``) or descending score (``"score"``)."""
+        rows = self._run("rows", order)
+        return rows if limit is None else rows.head(limit)
+
+    def mean(self, measures):
+        """Mean of each of ``measures`` over the matching countries, indexed by measure."""
+        return self._run("mean", tuple(measures))
+
+    def mean_by_region(self, measure):
+        """Mean of ``measure`` per region over the matching countries, indexed by region."""
+        return self._run("mean_by_region", measure)
+
+    def count_by_region(self):
+        """Number of matching countries per region, largest first, empty regions left out."""
+        return self._run("count_by_region")
+
+    def distinct(self, column):
+        """Sorted distinct values of ``column`` among the matching rows."""
+        return self._run("distinct", column)
+
+    def bounds(self, column):
+        """``(min, max)`` of ``column`` among the matching rows."""
+        return self._run("bounds", column)
+
+    def fit(self, metric):
+        """Slope, intercept, Pearson/Spearman correlation, mean and count of score on ``metric`` in the region."""
+        return self._run("fit", metric)
+
+    def extremes(self):
+        """Top and bottom country, score range and mean score of the query's region."""
+        return self._run("extremes")
+
+    def correlation(self, method="pearson"):
+        """Correlation matrix of the score and the six factors over the matching countries."""
+        return self._run("correlation", method)
+
+    # ---------------------------
+    # Operations
+    # ---------------------------
+    def _do_rows(self, order):
+        path = self.access_path()
+        with profiling.timed(f"query:{path}", "filter"):
+            if self.year is None:
+                rows = load_data()
+            elif path == "country index":
+                rows = load_data(self.year).iloc[_country_positions(year_version(self.year), self.year).get(self.country, [])]
+            elif path in ("trigram search", "score index"):
+                rows = filter_rows(self.year, self.min_score, self.region, self.search)
+            elif path == "rank index":
+                rows = rank_index(self.year).between(*self.ranks)
+            else:
+                rows = load_data(self.year)
+
+        residual = self._filters() - COVERS[path]
+        if residual:
+            with profiling.timed("query:scan", "filter"):
+                rows = rows[self._mask(rows, residual)]
+        if order != ORDER[path]:
+            by, ascending = (SCORE, False) if order == "score" else (RANK, True)
+            rows = rows.sort_values(by, ascending=ascending, kind="stable")
+        return rows
+
+    def _mask(self, rows, filters):
+        mask = np.ones(len(rows), dtype=bool)
+        if "country" in filters:
+            mask &= (rows["Country"] == self.country).to_numpy()
+        if "region" in filters:
+            mask &= (rows["Region"] == self.region).to_numpy()
+        if "min_score" in filters:
+            mask &= (rows[SCORE] >= self.min_score).to_numpy()
+        if "ranks" in filters:
+            low, high = self.ranks
+            if low is not None:
+                mask &= (rows[RANK] >= low).to_numpy()
+            if high is not None:
+                mask &= (rows[RANK] <= high).to_numpy()
+        if "search" in filters:
+            mask &= rows["Country"].astype(str).str.lower().str.contains(self.search, regex=False).to_numpy()
+        return mask
+
+    def _do_mean(self, measures):
+        measures = list(measures)
+        if self.uses_cube(measures):
+            return measure_means(load_cube(), self.year, measures, self.min_score, self.region)
+        return self._do_rows("rank")[measures].mean()
+
+    def _do_mean_by_region(self, measure):
+        if self.uses_cube([measure]):
+            return region_summary(load_cube(), self.year, measure, self.min_score, self.region)["mean"]
+        rows = self._do_rows("rank")
+        return rows.groupby(rows["Region"].astype(str))[measure].mean()
+
+    def _do_count_by_region(self):
+        if self.uses_cube([SCORE]):
+            counts = region_summary(load_cube(), self.year, SCORE, self.min_score, self.region)["count"]
+            counts = counts.astype(int).sort_values(ascending=False, kind="stable")
+        else:
+            counts = self._do_rows("rank")["Region"].astype(str).value_counts()
+        counts.index.name = "Region"
+        return counts[counts > 0]
+
+    def _do_distinct(self, column):
+        return sorted(self._do_rows("rank")[column].astype(str).unique().tolist())
+
+    def _do_bounds(self, column):
+        values = self._do_rows("rank")[column]
+        return values.min(), values.max()
+
+    def _stats_key(self):
+        if self.region is None:
+            raise ValueError("regional statistics need a query with a region")
+        return (self.year, self.region)
+
+    def _do_fit(self, metric):
+        if self.uses_stats_tables():
+            table = metric_stats()
+        else:
+            table = build_metric_stats(self._do_rows("rank"))
+        # No row when no country of the region has the metric that year: no fit, as with DuckDB
+        return table.reindex([self._stats_key() + (metric,)]).iloc[0].fillna({"count": 0})
+
+    def _do_extremes(self):
+        if self.uses_stats_tables():
+            table = region_extremes()
+        else:
+            table = build_region_extremes(self._do_rows("rank"))
+        return table.loc[self._stats_key()]
+
+    def _do_correlation(self, method):
+        if self.uses_stats_tables():
+            return correlation_matrix(self.year, self.region, method)
+        return self._do_rows("rank")[[SCORE] + FACTORS].corr(method=method)
+
+
+def _on_bucket_edge(score):
+    # The cube counts whole buckets, so only thresholds on a bucket edge split it exactly
+    buckets = score / BUCKET_WIDTH
+    return bool(np.isclose(buckets, round(buckets)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1024)
+def _execute(version, key, operation, args):
+    profiling.cache_miss("query")
+    query = Query(*key)
+    with profiling.timed(f"plan:{query.explain(operation)}", "filter"):
+        if settings.QUERY_ENGINE == "duckdb":
+            from happiness import duckdb_engine
+
+            return duckdb_engine.execute(query, operation, args)
+        return getattr(query, f"_do_{operation}")(*args)
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _country_positions(version, year):
+    countries = load_data(year)["Country"].astype(str)
+    positions = {}
+    for position, country in enumerate(countries):
+        positions.setdefault(country, []).append(position)
+    return positions
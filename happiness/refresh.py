@@ -0,0 +1,168 @@
+# ---------------------------
+# Live Data Refresh
+# ---------------------------
+"""
+Pick up edits to ``data/`` while the server runs, paying only for what changed.
+
+One background thread per server process watches ``data/`` (through
+``watchdog`` when it is installed, otherwise by comparing file times every
+``HAPPINESS_REFRESH_INTERVAL`` seconds). Once a CSV has been added, edited
+or removed and the folder has been quiet for a moment, it:
+
+1. ingests the folder, parsing only the new or edited CSVs, and moves to a
+   new snapshot (``happiness.data``). Caches of one year's rows (indexes,
+   query results, maps, scenario tables) are keyed on that year's version,
+   so the years the edit left alone keep them
+2. diffs the new table against the previous one by (Country, Year), so the
+   aggregate cube and regional statistics are built again only for the
+   (Year, Region) groups whose rows changed. Chart images are cached on
+   their inputs, so only charts of changed rows are drawn again
+3. builds the new version's shared structures, then publishes it
+
+Each open page checks the published version every interval from a small
+fragment (``live_updates``) and reruns when it changed. The rebuild has
+happened once for the process by then, so sessions rerun against warm
+caches instead of each reloading the data, and as every session's timer
+started when it opened, their reruns spread over the interval.
+"""
+
+import logging
+import threading
+import time
+
+import streamlit as st
+
+from happiness import data, settings
+
+SETTLE_S = 0.5  # quiet time before applying a change, so copies and saves can finish
+RESCAN_S = 60  # watchers can miss events (e.g. on network filesystems), so look anyway this often
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def warm(current):
+    """Build what sessions will ask for first on ``current``: the table, aggregates and changed years' indexes."""
+    if settings.QUERY_ENGINE == "duckdb":
+        from happiness import duckdb_engine
+
+        duckdb_engine.warm_up()
+        return
+
+    from happiness.aggregates import load_cube
+    from happiness.indexes import rank_index, score_index
+    from happiness.query import Query
+    from happiness.stats import metric_stats, region_extremes
+
+    data.load_data()
+    load_cube()
+    metric_stats()
+    region_extremes()
+    for year in sorted(current.changed_years() & set(current.paths)):
+        rank_index(year)
+        score_index(year)
+        Query(year).rows()
+
+
+def describe(current, change):
+    """One line for the sessions' notice, e.g. ``2015: 1 added, 3 changed``."""
+    if change is not None:
+        return str(change)
+    return "updated " + ", ".join(str(year) for year in sorted(current.changed_years()))
+
+
+class Refresher:
+    """Watches ``data/`` and applies its changes; ``version`` is the newest data version ready for sessions."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.version = data.data_version()
+        self.summary = ""
+        self.error = None
+        self._wake = threading.Event()
+        self._observer = self._watch()
+        self.thread = threading.Thread(target=self._loop, name="happiness-refresh", daemon=True)
+
+    def _watch(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ModuleNotFoundError:
+            return None  # scan every interval instead
+        wake = self._wake
+
+        class CsvChanged(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Not opens and reads (ingesting reads every CSV), nor data/.cache, which changes as a result
+                if event.event_type not in ("created", "modified", "deleted", "moved"):
+                    return
+                if any(str(path).endswith(".csv") for path in (event.src_path, getattr(event, "dest_path", ""))):
+                    wake.set()
+
+        observer = Observer()
+        try:
+            observer.schedule(CsvChanged(), str(data.DATA_DIR), recursive=True)
+            observer.start()
+        except OSError:  # e.g. out of inotify watches
+            return None
+        return observer
+
+    def _loop(self):
+        while True:
+            self._wake.wait(RESCAN_S if self._observer else self.interval)
+            while self._wake.wait(SETTLE_S):
+                self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as exc:  # e.g. a malformed CSV; the current data stays in service
+                self.error = f"{type(exc).__name__}: {exc}"
+                _LOGGER.exception("Refreshing %s failed", data.DATA_DIR)
+
+    def refresh(self):
+        """Apply any change to ``data/`` now; return the new snapshot, or ``None`` if the data is unchanged."""
+        current = data.advance()
+        if current is None:
+            return None
+        start = time.perf_counter()
+        change = current.change()
+        warm(current)
+        self.summary = describe(current, change)
+        self.error = None
+        self.version = current.version  # published last, so sessions rerun against warm caches
+        _LOGGER.info("Data refreshed in %.2fs: %s", time.perf_counter() - start, self.summary)
+        return current
+
+
+@st.cache_resource(show_spinner=False)
+def _refresher():
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    refresher = Refresher(settings.REFRESH_INTERVAL)
+    # The cached loaders look up the calling session; the refresh emits no elements
+    add_script_run_ctx(refresher.thread, get_script_run_ctx())
+    refresher.thread.start()
+    data.watched()
+    return refresher
+
+
+@st.experimental_fragment(run_every=settings.REFRESH_INTERVAL)
+def _check_for_update(refresher):
+    # Runs on its own every interval: a comparison, and a full rerun only when there is newer data
+    if refresher.version != st.session_state.get("data_version"):
+        st.session_state["data_update"] = refresher.summary
+        st.rerun()
+
+
+def live_updates():
+    """
+    Rerun this page whenever a newer version of ``data/`` is ready.
+
+    Call once per page, after ``st.set_page_config``. Does nothing with
+    ``HAPPINESS_REFRESH=0``.
+    """
+    if not settings.REFRESH:
+        return
+    refresher = _refresher()
+    if "data_update" in st.session_state:
+        st.toast(f"Data refreshed: {st.session_state.pop('data_update')}", icon="🔄")
+    st.session_state["data_version"] = refresher.version
+    _check_for_update(refresher)
@@ -0,0 +1,168 @@
+# ---------------------------
+# Figure Render Cache
+# ---------------------------
+"""
+Render chart builders to PNG once and reuse the bytes on later reruns.
+
+``show_figure(builder, *args)`` keys the image on the builder name, a hash
+of the file defining it (so a deploy that edits a chart builder never
+serves the old images from a shared cache) and a fingerprint of its
+arguments (the data it plots plus any widget values). A hit costs a lookup
+in the shared result cache (``happiness.result_cache``), so an image drawn
+by one session or replica is reused by the others; a miss draws the
+figure, rasterizes it and closes it so figures never pile up in pyplot's
+global registry.
+
+``ChartBatch`` renders cache misses in a pool of worker processes
+(matplotlib's Agg backend is not thread-safe), so a page can lay out
+all of its charts as placeholders first and fill them in as each
+render finishes. In the "client" render mode, charts that have a
+Vega-Lite version in ``happiness.vega_charts`` skip all of this and are
+drawn by the browser.
+"""
+
+import functools
+import hashlib
+import inspect
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+
+from happiness import profiling, settings, vega_charts, warmup
+from happiness.result_cache import results
+from happiness.warmup import plt
+
+# Same settings st.pyplot uses, so cached images look identical
+SAVEFIG_KWARGS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+def render_png(builder, *args, **kwargs):
+    """Draw ``builder(*args, **kwargs)``, return its PNG bytes and close the figure."""
+    with profiling.timed(f"draw:{builder.__name__}", "render"):
+        fig = builder(*args, **kwargs)
+    try:
+        buffer = io.BytesIO()
+        with profiling.timed(f"encode:{builder.__name__}", "render"):
+            fig.savefig(buffer, **SAVEFIG_KWARGS)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def code_version(builder):
+    """Hash of the source file of ``builder``, which covers the helpers it calls there too."""
+    return _source_hash(inspect.getsourcefile(builder))
+
+
+def figure_key(builder, *args, **kwargs):
+    # A chart depends only on its code and the frames it is drawn from, so its image outlives updates to data/
+    return results().key("figure", builder.__name__, code_version(builder), args, kwargs, versioned=False)
+
+
+def cached_png(builder, *args, **kwargs):
+    """PNG bytes for ``builder(*args, **kwargs)``, rendered only on a cache miss."""
+    key = figure_key(builder, *args, **kwargs)
+    image = results().get(key)
+    if image is None:
+        image = render_png(builder, *args, **kwargs)
+        results().put(key, image)
+    return image
+
+
+def show_figure(builder, *args, **kwargs):
+    """Display the chart drawn by ``builder``, reusing the cached image when its inputs are unchanged."""
+    image = cached_png(builder, *args, **kwargs)
+    profiling.count_bytes("png", len(image))
+    st.image(image, use_column_width=True)
+
+
+# ---------------------------
+# Background Rendering
+# ---------------------------
+@st.cache_resource(show_spinner=False)
+def render_pool():
+    """Process pool shared by all sessions, or ``None`` when rendering inline."""
+    if settings.RENDER_WORKERS < 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    # Streamlit installs the running page as ``__main__``, so "spawn" or "forkserver"
+    # workers would execute the page script again while starting up. Forked workers
+    # inherit the already imported chart modules; they only ever run ``render_png``.
+    # Forking while the warm-up thread imports would leave workers with a held lock; after it,
+    # they also start with the plotting stack loaded.
+    warmup.wait()
+    context = multiprocessing.get_context("fork")
+    return ProcessPoolExecutor(max_workers=settings.RENDER_WORKERS, mp_context=context)
+
+
+class ChartBatch:
+    """
+    Lay out charts as placeholders and fill them in as their renders finish.
+
+    Call ``show`` where each chart belongs on the page, then ``wait`` once
+    the rest of the page has been written.
+    """
+
+    def __init__(self):
+        self.pool = render_pool()
+        self._pending = {}
+
+    def show(self, builder, *args, **kwargs):
+        if settings.RENDER_MODE == "client":
+            with profiling.timed(f"spec:{builder.__name__}", "render"):
+                spec = vega_charts.spec_for(builder, *args, **kwargs)
+            if spec is not None:
+                st.vega_lite_chart(spec, use_container_width=True)
+                return
+        placeholder = st.empty()
+        key = figure_key(builder, *args, **kwargs)
+        image = results().get(key)
+        if image is None and self.pool is not None:
+            try:
+                future = self.pool.submit(render_png, builder, *args, **kwargs)
+            except BrokenProcessPool:
+                render_pool.clear()
+            else:
+                placeholder.caption("⏳ Rendering chart…")
+                self._pending[future] = (placeholder, key, builder, args, kwargs, time.perf_counter())
+                return
+        if image is None:
+            image = render_png(builder, *args, **kwargs)
+            results().put(key, image)
+        profiling.count_bytes("png", len(image))
+        placeholder.image(image, use_column_width=True)
+
+    def wait(self):
+        """Fill every pending placeholder, in completion order."""
+        error = None
+        for future in as_completed(self._pending):
+            placeholder, key, builder, args, kwargs, submitted = self._pending[future]
+            try:
+                image = future.result()
+                # Drawing happened in a worker, so only the submit-to-result time is known here
+                profiling.record(f"pool:{builder.__name__}", "render", time.perf_counter() - submitted)
+            except BrokenProcessPool:
+                render_pool.clear()
+                image = render_png(builder, *args, **kwargs)
+            except Exception as exc:  # re-raised below so the other charts still appear
+                placeholder.empty()
+                error = error or exc
+                continue
+            results().put(key, image)
+            profiling.count_bytes("png", len(image))
+            placeholder.image(image, use_column_width=True)
+        self._pending.clear()
+        if error is not None:
+            raise error
@@ -0,0 +1,299 @@
+# ---------------------------
+# Shared Result Cache
+# ---------------------------
+"""
+Results cache that several server replicas can share.
+
+``st.cache_resource`` keeps objects in one process, so every replica
+behind a load balancer would rebuild the same aggregates and redraw the
+same charts. The loaders here keep ``st.cache_resource`` as the fast
+in-process layer and, on a miss, ask ``results()`` before computing.
+``HAPPINESS_RESULT_CACHE`` picks the backend:
+
+- ``memory`` (default): LRU in this process, the previous behaviour
+- ``sqlite:///path/results.sqlite``: a file shared by the processes of one host or volume
+- ``redis://host:6379/0``: any Redis-compatible server (needs the ``redis`` package)
+
+Keys are content hashes of the inputs plus the data version, a hash of
+the content-addressed Parquet files built from ``data/``. Editing a CSV
+therefore changes every such key, and the first lookup that notices the
+new version drops the entries of older versions. Results that depend on
+nothing but their inputs (a chart of the frames it is given) are keyed
+on content alone and survive the change, so only charts whose data
+changed are drawn again. Entries also expire after
+``HAPPINESS_RESULT_CACHE_TTL`` seconds, and the memory and SQLite
+backends evict the least recently used entries beyond
+``HAPPINESS_RESULT_CACHE_MB``. Redis applies its own ``maxmemory`` policy.
+
+Values are pickled for the SQLite and Redis backends, so only point
+them at stores this deployment alone can write to.
+"""
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from happiness import profiling, settings
+from happiness.data import data_version
+
+CONTENT = "content"  # version of entries keyed on their inputs alone
+
+# ---------------------------
+# Content Hashes
+# ---------------------------
+def _update(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr((type(value).__name__, value.shape, getattr(value, "name", None))).encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        # Not repr(): it rounds floats and elides long arrays, so different arrays could collide
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        if value.dtype.hasobject:
+            _update(digest, value.ravel().tolist())
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        for name in sorted(value):
+            _update(digest, name)
+            _update(digest, value[name])
+    else:
+        digest.update(repr(value).encode())
+
+
+def fingerprint(*values):
+    """Stable hash of frames, series and plain Python values."""
+    digest = hashlib.sha1()
+    for value in values:
+        _update(digest, value)
+    return digest.hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+class MemoryBackend:
+    """Thread-safe LRU of live objects with a TTL and a total size budget."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (version, value, size, expires)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] and entry[3] < time.time():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, version):
+        size = _nbytes(value)
+        expires = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (version, value, size, expires)
+            self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                self._pop(next(iter(self._entries)))
+
+    def drop_versions_except(self, version):
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[0] not in (version, CONTENT)]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        self.size -= self._entries.pop(key)[2]
+
+
+class SQLiteBackend:
+    """Pickled results in one SQLite file, evicted by TTL and least recent use."""
+
+    def __init__(self, path, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, version TEXT, value BLOB, size INTEGER, expires REAL, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] and row[1] < now:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def put(self, key, value, version):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, version, blob, len(blob), now + self.ttl if self.ttl else 0, now),
+            )
+            self._db.execute("DELETE FROM results WHERE expires > 0 AND expires < ?", (now,))
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes, keep=key)
+
+    def _evict(self, excess, keep):
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM results WHERE key != ? ORDER BY used", (keep,)):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def drop_versions_except(self, version):
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE version NOT IN (?, ?)", (version, CONTENT))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+
+
+class RedisBackend:
+    """Pickled results in a Redis-compatible server; size eviction is left to its ``maxmemory`` policy."""
+
+    PREFIX = "happiness:"
+
+    def __init__(self, url, ttl):
+        try:
+            import redis
+        except ModuleNotFoundError as exc:
+            raise ModuleNotFoundError(
+                "HAPPINESS_RESULT_CACHE points at Redis; run `pip install redis` to use it"
+            ) from exc
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        # The version is part of every key handed out by ResultCache, see ResultCache.key
+        blob = self._client.get(self.PREFIX + key)
+        return None if blob is None else pickle.loads(blob)
+
+    def put(self, key, value, version):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._client.set(self.PREFIX + key, blob, ex=self.ttl or None)
+
+    def drop_versions_except(self, version):
+        keep = (f"{self.PREFIX}{version}:".encode(), f"{self.PREFIX}{CONTENT}:".encode())
+        stale = [key for key in self._client.scan_iter(match=f"{self.PREFIX}*", count=500)
+                 if not key.startswith(keep)]
+        for start in range(0, len(stale), 500):
+            self._client.delete(*stale[start:start + 500])
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=f"{self.PREFIX}*", count=500))
+        for start in range(0, len(keys), 500):
+            self._client.delete(*keys[start:start + 500])
+
+
+def make_backend(url, max_bytes, ttl):
+    """Backend for a ``HAPPINESS_RESULT_CACHE`` value."""
+    parsed = urlparse(url)
+    if url == "memory":
+        return MemoryBackend(max_bytes, ttl)
+    if parsed.scheme == "sqlite":
+        return SQLiteBackend(parsed.path or ":memory:", max_bytes, ttl)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend(url, ttl)
+    raise ValueError(f"unsupported HAPPINESS_RESULT_CACHE {url!r}; use memory, sqlite:///path or redis://host")
+
+
+# ---------------------------
+# Cache Front End
+# ---------------------------
+class ResultCache:
+    """Versioned, content-keyed get/put and compute-on-miss over one backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.version = None
+        self._lock = threading.Lock()
+
+    def key(self, namespace, *parts, versioned=True):
+        """
+        Key for ``parts`` under the current data version; also drops older versions once.
+
+        ``versioned=False`` keys ``parts`` alone, for results that depend on
+        nothing else (or whose parts carry their own version).
+        """
+        version = data_version()
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self.backend.drop_versions_except(version)
+                    self.version = version
+        return f"{version if versioned else CONTENT}:{namespace}:{fingerprint(*parts)}"
+
+    def get(self, key):
+        value = self.backend.get(key)
+        profiling.count_cache(f"shared:{key.split(':')[1]}", hit=value is not None)
+        return value
+
+    def put(self, key, value):
+        self.backend.put(key, value, key.split(":", 1)[0])
+
+    def get_or_compute(self, namespace, parts, compute, versioned=True):
+        """The cached result for ``parts``, calling ``compute()`` and storing it on a miss."""
+        key = self.key(namespace, *parts, versioned=versioned)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+
+@st.cache_resource(show_spinner=False)
+def results():
+    """The deployment's result cache, one per process."""
+    backend = make_backend(
+        settings.RESULT_CACHE, settings.RESULT_CACHE_MB * 1024 * 1024, settings.RESULT_CACHE_TTL,
+    )
+    return ResultCache(backend)
@@ -0,0 +1,125 @@
+# ---------------------------
+# What-If Scenarios
+# ---------------------------
+"""
+Re-score and re-rank countries under custom weights on the score's parts.
+
+A Happiness Score is the sum of the six factors and the Dystopia Residual.
+A scenario gives each of those seven components a weight (1 everywhere
+reproduces the published score and ranks), so a year's scenario scores
+are its published scores plus one matrix-vector product of its n x 7
+component matrix with the weights minus 1. Adding the change rather than
+summing the components keeps the files' rounding out of the scores. Many
+scenarios at once are one matrix product with an n x m weight matrix,
+ranked column by column with a single ``argsort``.
+
+Only the component matrix is cached; evaluating a scenario over a year's
+countries takes microseconds, so sliders can re-rank on every move.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import FACTORS, year_version
+from happiness.query import Query
+
+COMPONENTS = FACTORS + ["Dystopia Residual"]
+
+# Named weightings shown next to a custom scenario; unlisted components weigh 1
+PRESETS = {
+    "Published": {},
+    "Economy ×2": {"Economy (GDP per Capita)": 2.0},
+    "Health ×2": {"Health (Life Expectancy)": 2.0},
+    "Social ×2": {"Family": 2.0, "Generosity": 2.0, "Trust (Government Corruption)": 2.0},
+    "Factors only": {"Dystopia Residual": 0.0},
+}
+
+
+def weight_vector(weights):
+    """Weights per component (missing ones are 1), in ``COMPONENTS`` order."""
+    return np.array([float(weights.get(component, 1.0)) for component in COMPONENTS])
+
+
+def is_published(weights):
+    return bool(np.all(weight_vector(weights) == 1.0))
+
+
+def _ranks(scores):
+    """1-based rank of every row of each column of ``scores``, highest first; ties share the better rank."""
+    order = np.argsort(-scores, axis=0, kind="stable")
+    ranked = np.take_along_axis(scores, order, axis=0)
+    positions = np.arange(len(scores)).reshape(-1, *[1] * (scores.ndim - 1))
+    # Each sorted row takes the position of the first row with its score, as the published ranks do
+    first = np.ones(scores.shape, dtype=bool)
+    first[1:] = ranked[1:] != ranked[:-1]
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.maximum.accumulate(np.where(first, positions, 0), axis=0) + 1, axis=0)
+    return ranks
+
+
+class ScenarioTable:
+    """One year's component matrix, rows in published rank order."""
+
+    def __init__(self, rows):
+        self.countries = rows["Country"].astype(str).to_numpy()
+        self.published_rank = rows["Happiness Rank"].to_numpy()
+        factors = rows[FACTORS].to_numpy(dtype="float64")
+        score = rows["Happiness Score"].to_numpy(dtype="float64")
+        residual = rows["Dystopia Residual"].to_numpy(dtype="float64")
+        # A missing factor contributes nothing, and the residual (left NaN by harmonize then)
+        # is whatever the known factors do not explain, so the components add up to the score
+        residual = np.where(np.isnan(residual), score - np.nansum(factors, axis=1), residual)
+        self.values = np.ascontiguousarray(np.nan_to_num(np.column_stack([factors, residual])))
+        self.published_score = np.where(np.isnan(score), self.values.sum(axis=1), score)
+        self._positions = {country: position for position, country in enumerate(self.countries)}
+
+    def scores(self, weights):
+        """Scenario score of every country: the published score plus the change the weights make."""
+        return self.published_score + self.values @ (weight_vector(weights) - 1.0)
+
+    def rank_of(self, country, weights):
+        """Scenario rank of one country, by counting who scores higher (no sort)."""
+        scores = self.scores(weights)
+        return int(np.count_nonzero(scores > scores[self._positions[country]]) + 1)
+
+    def evaluate(self, scenarios):
+        """
+        Scores and ranks of every country under each scenario, as one batch.
+
+        ``scenarios`` maps names to weight dicts. Returns two frames indexed
+        by country with a column per scenario.
+        """
+        names = list(scenarios)
+        weights = np.column_stack([weight_vector(scenarios[name]) for name in names])
+        scores = self.published_score[:, None] + self.values @ (weights - 1.0)
+        index = pd.Index(self.countries, name="Country")
+        return pd.DataFrame(scores, index=index, columns=names), pd.DataFrame(_ranks(scores), index=index, columns=names)
+
+    def annotate(self, rows, weights):
+        """
+        Copy of ``rows`` (any of this year's rows) with ``Scenario Score``,
+        ``Scenario Rank`` and ``Rank Change`` columns, sorted by scenario rank.
+
+        Ranks are among all of the year's countries, not just ``rows``.
+        """
+        scores = self.scores(weights)
+        ranks = _ranks(scores)
+        positions = rows["Country"].astype(str).map(self._positions).to_numpy()
+        result = rows.assign(
+            **{"Scenario Score": scores[positions], "Scenario Rank": ranks[positions],
+               "Rank Change": self.published_rank[positions] - ranks[positions]}
+        )
+        return result.sort_values("Scenario Rank", kind="stable")
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _scenario_table(version, year):
+    profiling.cache_miss("scenario_table")
+    return ScenarioTable(Query(year).rows())  # via the query engine, so DuckDB mode stays out of core
+
+
+def scenario_table(year):
+    """``year``'s component matrix, shared by all sessions."""
+    return profiling.cache_lookup("scenario_table", "aggregate", _scenario_table, year_version(year), year)
@@ -0,0 +1,65 @@
+# ---------------------------
+# Deployment Settings
+# ---------------------------
+"""
+Per-deployment switches, read once from ``HAPPINESS_*`` environment variables.
+
+Example::
+
+    HAPPINESS_RENDER_WORKERS=0 streamlit run app.py
+"""
+
+import os
+from pathlib import Path
+
+
+def _int(name, default):
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+# Folder holding the yearly <year>.csv files
+DATA_DIR = Path(os.environ.get("HAPPINESS_DATA_DIR") or Path(__file__).resolve().parent.parent / "data")
+
+# Worker processes used to draw charts in the background; 0 draws them on the script thread
+RENDER_WORKERS = _int("HAPPINESS_RENDER_WORKERS", min(4, os.cpu_count() or 1))
+
+# Time every load, filter, aggregation and render and show the numbers in the sidebar;
+# a single tab can also opt in with ?profile=1
+PROFILE = bool(_int("HAPPINESS_PROFILE", 0))
+
+# JSON-lines file that receives one profile per rerun while profiling is on
+PROFILE_LOG = os.environ.get("HAPPINESS_PROFILE_LOG") or None
+
+# Warm up the plotting stack and preload the dataset in the background when the server starts
+WARMUP = bool(_int("HAPPINESS_WARMUP", 1))
+
+# "server" rasterizes every chart with matplotlib; "client" sends the Global Summary
+# charts as Vega-Lite specs that the browser draws
+RENDER_MODE = os.environ.get("HAPPINESS_RENDER_MODE", "").strip().lower() or "server"
+if RENDER_MODE not in ("server", "client"):
+    raise ValueError(f"HAPPINESS_RENDER_MODE must be 'server' or 'client', not {RENDER_MODE!r}")
+
+# Result cache shared by sessions (and replicas): "memory", "sqlite:///path" or "redis://host:port/db"
+RESULT_CACHE = os.environ.get("HAPPINESS_RESULT_CACHE", "").strip() or "memory"
+
+# Seconds a cached result stays valid (0 keeps it until evicted) and total size budget in MB
+RESULT_CACHE_TTL = _int("HAPPINESS_RESULT_CACHE_TTL", 24 * 60 * 60)
+RESULT_CACHE_MB = _int("HAPPINESS_RESULT_CACHE_MB", 256)
+
+# Rows read at a time from respondent-level files in data/respondents/
+STREAM_CHUNK_ROWS = _int("HAPPINESS_STREAM_CHUNK_ROWS", 200_000)
+
+# "pandas" answers page queries from the in-memory table; "duckdb" runs them as SQL over the Parquet cache
+QUERY_ENGINE = os.environ.get("HAPPINESS_QUERY_ENGINE", "").strip().lower() or "pandas"
+if QUERY_ENGINE not in ("pandas", "duckdb"):
+    raise ValueError(f"HAPPINESS_QUERY_ENGINE must be 'pandas' or 'duckdb', not {QUERY_ENGINE!r}")
+
+# Regions with more points than this draw the Regional Filter scatter as a 2-D density
+SCATTER_MAX_POINTS = _int("HAPPINESS_SCATTER_MAX_POINTS", 1000)
+
+# Watch data/ and rerun open pages when it changes (0: notice changes on the next data access instead)
+REFRESH = bool(_int("HAPPINESS_REFRESH", 1))
+
+# Seconds between each session's check for newer data (and between scans of data/ without watchdog)
+REFRESH_INTERVAL = max(1, _int("HAPPINESS_REFRESH_INTERVAL", 5))
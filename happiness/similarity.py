@@ -0,0 +1,117 @@
+# ---------------------------
+# Similar Countries
+# ---------------------------
+"""
+Nearest neighbours of a country-year over the six factor values.
+
+Each year's factor vectors are read straight from its Parquet file and
+cached under that file's name, which carries a hash of the CSV's content.
+Adding (or editing) a year therefore reads only that year; the combined
+index just stacks the cached blocks into one contiguous matrix.
+
+A lookup gets the weighted distance from the selected row to every row
+with two matrix-vector products, takes each country's closest year with
+one ``reduceat`` and picks the k closest countries with ``argpartition``.
+That is tens of microseconds for thousands of country-years, with no n x n
+distance matrix to build or keep. Factors can be z-score normalized (over
+all years) so each one counts equally, and weighted.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import FACTORS, data_version, parquet_paths
+
+LABELS = ["Country", "Year", "Happiness Score"]
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _year_block(path):
+    # Keyed on the path, whose file name carries the content hash of the year's CSV
+    profiling.cache_miss("similarity_block")
+    rows = pd.read_parquet(path, columns=LABELS + FACTORS).dropna(subset=FACTORS)  # no distance without all six
+    rows["Country"] = rows["Country"].astype(str)
+    return rows[LABELS].reset_index(drop=True), rows[FACTORS].to_numpy(dtype="float64")
+
+
+class NeighbourIndex:
+    """Factor vectors of every country-year, with top-k nearest-neighbour lookups."""
+
+    def __init__(self, blocks):
+        labels = pd.concat([labels for labels, _ in blocks], ignore_index=True)
+        vectors = np.vstack([vectors for _, vectors in blocks])
+
+        # Rows grouped by country, so a country's best year is one reduceat over its slice
+        order = np.argsort(labels["Country"].to_numpy(), kind="stable")
+        self.countries = labels["Country"].to_numpy()[order]
+        self.years = labels["Year"].to_numpy()[order]
+        self.scores = labels["Happiness Score"].to_numpy()[order]
+        self.vectors = np.ascontiguousarray(vectors[order])
+        std = self.vectors.std(axis=0)
+        std = np.where(std > 0, std, 1.0)  # a constant factor contributes nothing either way
+        self.normalized = self.vectors / std
+        # Squared entries, so a weighted distance to every row is two matrix-vector products
+        self._squares = {False: self.vectors ** 2, True: self.normalized ** 2}
+
+        new_country = np.ones(len(order), dtype=bool)
+        new_country[1:] = self.countries[1:] != self.countries[:-1]
+        self._starts = np.flatnonzero(new_country)
+        self._ends = np.append(self._starts[1:], len(order))
+        self._group = np.cumsum(new_country) - 1
+        self._positions = {key: position for position, key in enumerate(zip(self.countries, self.years))}
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def nearest(self, country, year, k=5, weights=None, normalize=True):
+        """
+        The ``k`` countries closest to ``country`` in ``year``, nearest first.
+
+        Each other country appears once, with its closest year. ``weights``
+        maps factor names to multipliers (missing factors weigh 1). The frame
+        is empty when the country has no complete factor row that year.
+        """
+        position = self._positions.get((country, year))
+        k = min(k, len(self._starts) - 1)
+        if position is None or k <= 0:
+            return _frame([], [], [], [])
+
+        vectors = self.normalized if normalize else self.vectors
+        w = np.array([float((weights or {}).get(factor, 1.0)) for factor in FACTORS])
+        # sum w (x - q)^2 = x^2 . w - 2 x . (w q) + q . (w q), without an n x 6 temporary
+        probe = vectors[position] * w
+        squared = self._squares[normalize] @ w - 2 * (vectors @ probe) + vectors[position] @ probe
+        np.maximum(squared, 0, out=squared)  # rounding can leave tiny negatives
+
+        best = np.minimum.reduceat(squared, self._starts)
+        best[self._group[position]] = np.inf  # not the country itself in another year
+        groups = np.argpartition(best, k - 1)[:k]
+        groups = groups[np.argsort(best[groups], kind="stable")]
+        rows = [start + int(np.argmin(squared[start:end])) for start, end in zip(self._starts[groups], self._ends[groups])]
+
+        return _frame(self.countries[rows], self.years[rows], self.scores[rows], np.sqrt(squared[rows]))
+
+
+def _frame(countries, years, scores, distances):
+    return pd.DataFrame({"Country": countries, "Year": years, "Happiness Score": scores, "Distance": distances})
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _neighbour_index(version):
+    profiling.cache_miss("similarity_index")
+    blocks = [_year_block(path) for _, path in sorted(parquet_paths().items())]
+    return NeighbourIndex(blocks)
+
+
+def neighbour_index():
+    """The index over every year in ``data/``, shared by all sessions."""
+    return profiling.cache_lookup("similarity_index", "filter", _neighbour_index, data_version())
+
+
+def similar_countries(country, year, k=5, weights=None, normalize=True):
+    """Shortcut for ``neighbour_index().nearest(...)``, timed when profiling."""
+    index = neighbour_index()
+    with profiling.timed("similarity:nearest", "filter"):
+        return index.nearest(country, year, k, weights, normalize)
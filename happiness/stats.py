@@ -0,0 +1,138 @@
+# ---------------------------
+# Regional Statistics Engine
+# ---------------------------
+"""
+Per-region statistics for every year and metric, computed in one pass.
+
+``metric_stats`` fits Happiness Score against each factor for every
+(year, region) at once: the least-squares slope and intercept and the
+Pearson and Spearman correlations all follow from grouped sums of x, y,
+x², y² and xy, so there is no per-pair ``np.polyfit``/``np.corrcoef``.
+``region_extremes`` holds each region's top and bottom country. Both
+tables are built once per data load (and shared with other replicas
+through ``happiness.result_cache``), so switching region or metric on
+the Regional Filter page is a lookup.
+"""
+
+import numpy as np
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import FACTORS, data_version, load_data, rebuild_by_group, year_version
+from happiness.result_cache import results
+
+SCORE = "Happiness Score"
+KEYS = ["Year", "Region", "Metric"]
+
+
+def _fit(grouped, x, y):
+    """Slope, intercept and correlation of ``y`` on ``x`` from grouped sums."""
+    sums = grouped[[x, y, "xx", "yy", "xy"]].sum()
+    n = grouped[x].count()
+    cov = sums["xy"] - sums[x] * sums[y] / n
+    var_x = sums["xx"] - sums[x] ** 2 / n
+    var_y = sums["yy"] - sums[y] ** 2 / n
+    slope = cov / var_x
+    intercept = (sums[y] - slope * sums[x]) / n
+    corr = cov / np.sqrt(var_x * var_y)
+    return n, sums[x] / n, slope, intercept, corr
+
+
+def build_metric_stats(df):
+    """Return one row per (Year, Region, Metric) with the fit and correlation columns."""
+    long = df.melt(
+        id_vars=["Year", "Region", SCORE], value_vars=FACTORS,
+        var_name="Metric", value_name="x",
+    ).dropna(subset=["x", SCORE])
+    long["Region"] = long["Region"].astype(str)
+    long = long.rename(columns={SCORE: "y"})
+
+    long = long.assign(xx=long["x"] ** 2, yy=long["y"] ** 2, xy=long["x"] * long["y"])
+    grouped = long.groupby(KEYS)
+    n, mean, slope, intercept, pearson = _fit(grouped, "x", "y")
+
+    # Spearman is Pearson on the within-group ranks
+    rank_x, rank_y = grouped["x"].rank(), grouped["y"].rank()
+    ranked = long.assign(x=rank_x, y=rank_y, xx=rank_x ** 2, yy=rank_y ** 2, xy=rank_x * rank_y)
+    *_, spearman = _fit(ranked.groupby(KEYS), "x", "y")
+
+    stats = mean.to_frame("mean").assign(
+        count=n, slope=slope, intercept=intercept, pearson=pearson, spearman=spearman,
+    )
+    # Same guard as before: no trend line when the metric is constant in the region
+    flat = grouped["x"].nunique() < 2
+    stats.loc[flat, ["slope", "intercept", "pearson", "spearman"]] = np.nan
+    return stats
+
+
+def build_region_extremes(df):
+    """Return each (Year, Region)'s top and bottom country and score range."""
+    keyed = df.assign(Region=df["Region"].astype(str), Country=df["Country"].astype(str))
+    grouped = keyed.groupby(["Year", "Region"])[SCORE]
+    top = keyed.loc[grouped.idxmax(), ["Year", "Region", "Country", SCORE]].set_index(["Year", "Region"])
+    bottom = keyed.loc[grouped.idxmin(), ["Year", "Region", "Country", SCORE]].set_index(["Year", "Region"])
+
+    extremes = top.rename(columns={"Country": "top_country", SCORE: "top_score"}).join(
+        bottom.rename(columns={"Country": "bottom_country", SCORE: "bottom_score"})
+    )
+    extremes["range"] = extremes["top_score"] - extremes["bottom_score"]
+    extremes["mean_score"] = grouped.mean()
+    return extremes
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _metric_stats(version):
+    profiling.cache_miss("metric_stats")
+
+    def compute():
+        df = load_data()
+        with profiling.timed("build_metric_stats", "aggregate"):
+            return rebuild_by_group("metric_stats", build_metric_stats, df)
+
+    return results().get_or_compute("metric_stats", (), compute)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _region_extremes(version):
+    profiling.cache_miss("region_extremes")
+
+    def compute():
+        df = load_data()
+        with profiling.timed("build_region_extremes", "aggregate"):
+            return rebuild_by_group("region_extremes", build_region_extremes, df)
+
+    return results().get_or_compute("region_extremes", (), compute)
+
+
+def metric_stats():
+    """Fit/correlation table for every year, region and metric, shared by all sessions."""
+    return profiling.cache_lookup("metric_stats", "aggregate", _metric_stats, data_version())
+
+
+def region_extremes():
+    """Top/bottom country table for every year and region, shared by all sessions."""
+    return profiling.cache_lookup("region_extremes", "aggregate", _region_extremes, data_version())
+
+
+# ---------------------------
+# Correlation Matrix
+# ---------------------------
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _correlation_matrix(version, year, region, method):
+    profiling.cache_miss("correlation_matrix")
+
+    def compute():
+        df = load_data(year)
+        if region is not None:
+            df = df[df["Region"] == region]
+        return df[[SCORE] + FACTORS].corr(method=method)
+
+    # Keyed on the year's own version, so updates to other years keep the entry
+    return results().get_or_compute("correlation_matrix", (version, year, region, method), compute, versioned=False)
+
+
+def correlation_matrix(year, region=None, method="pearson"):
+    """Pairwise correlations of the score and the six factors, optionally within one region."""
+    return profiling.cache_lookup(
+        "correlation_matrix", "aggregate", _correlation_matrix, year_version(year), year, region, method,
+    )
@@ -0,0 +1,109 @@
+# ---------------------------
+# Streaming Respondent Ingestion
+# ---------------------------
+"""
+Fold respondent-level (or sub-national) survey rows into country rows.
+
+A file ``data/respondents/<year>.csv`` holds one row per respondent with
+a country, a happiness score (``Happiness Score`` or ``Life Ladder``),
+optionally the six factors, a world ``Region`` and a survey ``Weight``.
+It is read ``HAPPINESS_STREAM_CHUNK_ROWS`` rows at a time and each chunk
+is reduced to per-country weighted sums, so memory grows with the number
+of countries, never with the number of rows. The sums give each
+country's mean score and factors, its respondent count, the standard
+error of the mean score and its rank, in the same columns as a yearly
+summary CSV, so the rest of the dashboard does not know the difference.
+"""
+
+import numpy as np
+import pandas as pd
+
+from happiness import settings
+from happiness.data import COLUMN_ALIASES, COUNTRY_ALIASES, FACTORS, harmonize
+
+SCORE = "Happiness Score"
+VALUES = [SCORE] + FACTORS
+
+# Column names found in respondent-level extracts, on top of the yearly-release aliases
+RESPONDENT_ALIASES = {
+    **COLUMN_ALIASES,
+    "Country name": "Country",
+    "Regional indicator": "Region",
+    "Life Ladder": SCORE,
+    "Ladder": SCORE,
+    "wgt": "Weight",
+}
+
+
+def _fold(chunk, values):
+    """Per-country weighted sums of one chunk."""
+    country = chunk["Country"].str.strip().replace(COUNTRY_ALIASES)
+    if "Weight" in chunk:
+        weight = pd.to_numeric(chunk["Weight"], errors="coerce")
+    else:
+        weight = pd.Series(1.0, index=chunk.index)
+
+    sums = {}
+    for col in values:
+        x = pd.to_numeric(chunk[col], errors="coerce")
+        w = weight.where(x.notna())  # a missing answer carries no weight
+        sums[f"{col}|w"] = w
+        sums[f"{col}|wx"] = w * x
+        if col == SCORE:
+            sums["wyy"] = w * x * x
+            sums["ww"] = w * w
+            sums["n"] = w.notna().astype("int64")
+    return pd.DataFrame(sums).groupby(country.to_numpy()).sum()
+
+
+def _note_regions(chunk, regions):
+    """Remember the first region reported for each country."""
+    if "Region" not in chunk:
+        return
+    named = chunk.dropna(subset=["Region"])
+    first = named.groupby(named["Country"].str.strip().replace(COUNTRY_ALIASES).to_numpy())["Region"].first()
+    for country, region in first.items():
+        regions.setdefault(country, region.strip())
+
+
+def _summarize(totals, regions, values, year):
+    out = pd.DataFrame(index=totals.index)
+    for col in values:
+        out[col] = totals[f"{col}|wx"] / totals[f"{col}|w"]
+
+    # Weighted variance of the score, and Kish's effective sample size for its standard error
+    weights = totals[f"{SCORE}|w"]
+    variance = (totals["wyy"] / weights - out[SCORE] ** 2).clip(lower=0)
+    n_eff = weights ** 2 / totals["ww"]
+    out["Standard Error"] = np.sqrt(variance / (n_eff - 1)).where(n_eff > 1)
+    out["Respondents"] = totals["n"]
+
+    out = out[out[SCORE].notna()]
+    out["Happiness Rank"] = out[SCORE].rank(ascending=False, method="min").astype("int64")
+    out["Region"] = out.index.map(regions)
+    out = out.rename_axis("Country").reset_index().sort_values("Happiness Rank", ignore_index=True)
+    return harmonize(out, year)
+
+
+def fold_respondents(path, year, chunk_rows=None):
+    """Return ``year``'s country table aggregated from the respondent rows in ``path``."""
+    header = pd.read_csv(path, nrows=0).columns
+    wanted = {raw: RESPONDENT_ALIASES.get(raw.strip(), raw.strip()) for raw in header}
+    wanted = {raw: name for raw, name in wanted.items() if name in {"Country", "Region", "Weight", *VALUES}}
+    if {"Country", SCORE} - set(wanted.values()):
+        raise ValueError(f"{path} needs a Country column and a Happiness Score or Life Ladder column")
+    values = [col for col in VALUES if col in wanted.values()]
+
+    totals, regions = None, {}
+    reader = pd.read_csv(
+        path, usecols=list(wanted), chunksize=chunk_rows or settings.STREAM_CHUNK_ROWS,
+        dtype={raw: str for raw, name in wanted.items() if name in ("Country", "Region")},
+    )
+    for chunk in reader:
+        chunk = chunk.rename(columns=wanted)
+        part = _fold(chunk, values)
+        totals = part if totals is None else totals.add(part, fill_value=0)
+        _note_regions(chunk, regions)
+    if totals is None:
+        raise ValueError(f"{path} has no rows")
+    return _summarize(totals, regions, values, year)
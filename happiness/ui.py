@@ -0,0 +1,50 @@
+# ---------------------------
+# Shared Page Widgets
+# ---------------------------
+"""Widgets and page structure that appear on more than one page."""
+
+import functools
+
+import streamlit as st
+
+from happiness import profiling
+from happiness.data import available_years
+from happiness.scenarios import COMPONENTS
+
+
+def year_selector():
+    """Sidebar selectbox over the years found in ``data/``, newest first."""
+    years = available_years()[::-1]
+    return st.sidebar.selectbox("Select Year", years)
+
+
+def scenario_weights(key):
+    """What-if weight sliders for the seven score components; returns ``{component: weight}``."""
+    with st.expander("⚖️ What-if weights"):
+        st.caption("1 everywhere is the published score; 0 drops a component from it.")
+        columns = st.columns(4)
+        return {
+            component: columns[i % 4].slider(component, 0.0, 3.0, 1.0, step=0.1, key=f"{key}:{component}")
+            for i, component in enumerate(COMPONENTS)
+        }
+
+
+def fragment(page, section):
+    """
+    Decorator: run a page section as a Streamlit fragment.
+
+    A widget created inside the section reruns only that section, with the
+    arguments of the last full run, and sends only its elements again. The
+    rest of the page (and the charts it already sent) stays as it was.
+    Fragments cannot write to the sidebar, so their widgets live in the
+    section itself.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with profiling.fragment(f"{page} / {section}"):
+                return fn(*args, **kwargs)
+
+        return st.experimental_fragment(run)
+
+    return decorate
@@ -0,0 +1,118 @@
+# ---------------------------
+# Client-Side Charts (Vega-Lite)
+# ---------------------------
+"""
+Vega-Lite versions of the Global Summary charts and the Top Trends top 10.
+
+With ``HAPPINESS_RENDER_MODE=client`` the regional bar charts, the region
+pie and the top-10 bar (redrawn on every what-if slider move) are sent as
+small declarative specs holding only the values shown, and the browser
+draws them. The server then does no matplotlib work for these charts at
+all. ``ChartBatch.show`` looks up the spec builder by the name of the
+matplotlib builder it replaces, so pages call the same
+``charts.show(figures.region_bar, ...)`` in both modes.
+"""
+
+# Nearest Vega colour scheme for each seaborn palette used by the pages
+SCHEMES = {
+    "viridis": "viridis",
+    "coolwarm": "blueorange",
+    "plasma": "plasma",
+    "rocket": "magma",
+    "cubehelix": "cividis",
+}
+
+
+def region_bar(values, palette, title, xlabel, figsize=(10, 5)):
+    """Horizontal bar per region, in the order of ``values`` (see ``figures.region_bar``)."""
+    regions = [str(region) for region in values.index]
+    return {
+        "title": title,
+        "height": 36 * len(regions),
+        "data": {"values": [
+            {"Region": region, "value": round(float(value), 4)}
+            for region, value in zip(regions, values.to_numpy())
+        ]},
+        "mark": {"type": "bar"},
+        "encoding": {
+            "y": {"field": "Region", "type": "nominal", "sort": regions, "title": "Region"},
+            "x": {"field": "value", "type": "quantitative", "title": xlabel},
+            "color": {
+                "field": "Region", "type": "ordinal", "sort": regions, "legend": None,
+                "scale": {"scheme": SCHEMES.get(palette, "viridis")},
+            },
+            "tooltip": [
+                {"field": "Region", "type": "nominal"},
+                {"field": "value", "type": "quantitative", "title": xlabel, "format": ".3f"},
+            ],
+        },
+    }
+
+
+def region_pie(region_counts):
+    """Share of countries per region (see ``figures.region_pie``)."""
+    return {
+        "data": {"values": [
+            {"Region": str(region), "count": int(count)}
+            for region, count in region_counts.items()
+        ]},
+        "transform": [
+            {"joinaggregate": [{"op": "sum", "field": "count", "as": "total"}]},
+            {"calculate": "datum.count / datum.total", "as": "share"},
+        ],
+        "encoding": {
+            "theta": {"field": "count", "type": "quantitative", "stack": True},
+            "color": {"field": "Region", "type": "nominal", "sort": None},
+        },
+        "layer": [
+            {
+                "mark": {"type": "arc", "outerRadius": 140},
+                "encoding": {"tooltip": [
+                    {"field": "Region", "type": "nominal"},
+                    {"field": "count", "type": "quantitative", "title": "Countries"},
+                    {"field": "share", "type": "quantitative", "format": ".1%"},
+                ]},
+            },
+            {
+                "mark": {"type": "text", "radius": 165},
+                "encoding": {"text": {"field": "share", "type": "quantitative", "format": ".1%"}},
+            },
+        ],
+        "view": {"stroke": None},
+    }
+
+
+def top10_bar(top10, score="Happiness Score"):
+    """Bar per country, best first (see ``figures.top10_bar``)."""
+    countries = [str(country) for country in top10["Country"]]
+    title = "Top 10 Happiest Countries (Filtered)" if score == "Happiness Score" else f"Top 10 Countries by {score} (Filtered)"
+    return {
+        "title": title,
+        "height": 32 * len(countries),
+        "data": {"values": [
+            {"Country": country, "value": round(float(value), 4)}
+            for country, value in zip(countries, top10[score].to_numpy())
+        ]},
+        "mark": {"type": "bar"},
+        "encoding": {
+            "y": {"field": "Country", "type": "nominal", "sort": countries, "title": "Country"},
+            "x": {"field": "value", "type": "quantitative", "title": score},
+            "color": {
+                "field": "Country", "type": "ordinal", "sort": countries, "legend": None,
+                "scale": {"scheme": "viridis"},
+            },
+            "tooltip": [
+                {"field": "Country", "type": "nominal"},
+                {"field": "value", "type": "quantitative", "title": score, "format": ".3f"},
+            ],
+        },
+    }
+
+
+SPECS = {"region_bar": region_bar, "region_pie": region_pie, "top10_bar": top10_bar}
+
+
+def spec_for(builder, *args, **kwargs):
+    """Vega-Lite spec replacing matplotlib ``builder``'s chart, or ``None`` if there is none."""
+    spec_builder = SPECS.get(builder.__name__)
+    return None if spec_builder is None else spec_builder(*args, **kwargs)
@@ -0,0 +1,111 @@
+# ---------------------------
+# Cold Start
+# ---------------------------
+"""
+Load the plotting stack only when a chart is drawn, and warm it up early.
+
+``plt`` and ``sns`` are stand-ins for ``matplotlib.pyplot`` and
+``seaborn`` that import the real module (with the Agg backend selected)
+the first time an attribute is used, so importing a page or the chart
+builders costs nothing until a chart is actually drawn.
+
+``start()`` runs once per server process, in a background thread: it
+imports the plotting libraries, draws and rasterizes a throwaway figure
+so matplotlib's font cache and text layout are ready, imports plotly and
+preloads the shared dataset and aggregate cube (or, with the DuckDB query
+engine, opens its database). The first session to open
+the landing page triggers it; by the time it navigates to a chart page
+the expensive setup is done. Set ``HAPPINESS_WARMUP=0`` to skip it.
+"""
+
+import importlib
+import io
+import threading
+
+import streamlit as st
+
+from happiness import settings
+
+_import_lock = threading.Lock()
+
+
+def _import(name):
+    with _import_lock:
+        if name == "matplotlib.pyplot" or name == "seaborn":
+            import matplotlib
+
+            # Must be chosen before pyplot is first imported; the server has no display
+            matplotlib.use("Agg")
+        return importlib.import_module(name)
+
+
+class LazyModule:
+    """Module stand-in that imports ``name`` on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = _import(self._name)
+        return getattr(self._module, attr)
+
+    def __reduce__(self):
+        # Pickled with chart builders sent to render workers
+        return LazyModule, (self._name,)
+
+
+plt = LazyModule("matplotlib.pyplot")
+sns = LazyModule("seaborn")
+
+
+def warm_plotting():
+    """Import matplotlib/seaborn and render one small figure with text to fill the font caches."""
+    fig, ax = plt.subplots(figsize=(2, 1))
+    sns.barplot(x=[1.0], y=["warm-up"], ax=ax)
+    ax.set_title("Warm-up")
+    fig.savefig(io.BytesIO(), format="png", dpi=50, bbox_inches="tight")
+    plt.close(fig)
+
+
+def warm_up():
+    """Everything a first chart page would otherwise pay for on its first run."""
+    warm_plotting()
+    try:
+        importlib.import_module("plotly.graph_objects")
+    except ModuleNotFoundError:  # the Country Explorer map says so itself
+        pass
+
+    if settings.QUERY_ENGINE == "duckdb":
+        from happiness import duckdb_engine
+
+        duckdb_engine.warm_up()  # pages never load the full table in this mode
+        return
+
+    from happiness.aggregates import load_cube
+
+    load_cube()  # loads (and if needed ingests) the dataset on the way
+
+
+@st.cache_resource(show_spinner=False)
+def _warm_up_thread():
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    thread = threading.Thread(target=warm_up, name="happiness-warmup", daemon=True)
+    # The cached loaders look up the calling session; the warm-up emits no elements
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return thread
+
+
+def start():
+    """Begin the once-per-process warm-up in the background, unless disabled."""
+    if settings.WARMUP:
+        _warm_up_thread()
+
+
+def wait():
+    """Block until the warm-up is done; a fork taken mid-import would inherit a held import lock."""
+    if settings.WARMUP:
+        _warm_up_thread().join()
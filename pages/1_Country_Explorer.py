@@ -4,14 +4,21 @@
 
 # Import essential libraries
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
+from happiness import figures, profiling, refresh, warmup
+from happiness.plotly_charts import choropleth, treemap
+from happiness.query import Query
+from happiness.render import show_figure
+from happiness.scenarios import scenario_table
+from happiness.similarity import similar_countries
+from happiness.ui import fragment, scenario_weights, year_selector
 
 # ---------------------------
 # Streamlit Page Configuration
 # ---------------------------
 st.set_page_config(page_title="Country Explorer", layout="wide")
+profiling.begin("Country Explorer")
+warmup.start()
+refresh.live_updates()
 st.title("Country Happiness Explorer")
 
 # Introduction text
@@ -20,47 +27,30 @@ Welcome to the **Country Happiness Explorer**!
 This tool allows you to:
 - Analyze a country's happiness score across key life factors.
 - Compare it with global averages.
-- See how countries rank globally in 2015.
+- See how countries rank globally in a selected year.
 - Visualize happiness scores on a world map.
 """)
 
 # ---------------------------
-# Load Dataset (cached)
+# Load Dataset (shared across sessions)
 # ---------------------------
-@st.cache_data
-def load_data():
-    return pd.read_csv("data/2015.csv")
-
-df = load_data()
-
-# ---------------------------
-# Sidebar Filters & Controls
-# ---------------------------
-with st.sidebar:
-    st.header("Controls")
-
-    # Dropdown with searchable country list
-    country_list = df["Country"].sort_values().unique()
-    country_input = st.selectbox("Select a country", options=country_list, index=list(country_list).index("Pakistan"))
-
-    # Rank range slider
-    min_rank = int(df["Happiness Rank"].min())
-    max_rank = int(df["Happiness Rank"].max())
-    rank_range = st.slider("Select rank range", min_rank, max_rank, (1, 20))
-
-# ---------------------------
-# Layout: Two Column Display
-# ---------------------------
-col1, col2 = st.columns(2)
+year = year_selector()
+query = Query(year)  # every filter and average below is planned by happiness.query
 
 # ===========================
 # COLUMN 1: Country Profile
 # ===========================
-with col1:
+@fragment("Country Explorer", "country profile")
+def country_profile(query, year):
+    # Dropdown with searchable country list
+    country_list = query.distinct("Country")
+    default_country = country_list.index("Pakistan") if "Pakistan" in country_list else 0
+    country_input = st.selectbox("Select a country", options=country_list, index=default_country)
+
     st.subheader(f"Factor Breakdown for: **{country_input}**")
 
     # Filter the country data
-    country_data = df[df["Country"] == country_input]
+    country_data = query.where(country=country_input).rows()
 
     if not country_data.empty:
         country_row = country_data.iloc[0]
@@ -78,20 +68,11 @@ with col1:
 
         st.markdown("### Factor Contributions Compared to Global Average")
 
-        global_avg = df[factors].mean()
-        country_values = country_row[factors]
+        global_avg = query.mean(factors)
+        country_values = country_row[factors].astype(float)
         diff = country_values - global_avg
 
-        fig1, ax1 = plt.subplots(figsize=(6, 4))
-        bar_colors = ["#2a9d8f" if d >= 0 else "#e76f51" for d in diff]
-
-        ax1.bar(factors, country_values, color=bar_colors, edgecolor="black")
-        ax1.axhline(global_avg.mean(), color='gray', linestyle='--', linewidth=1)
-        ax1.set_ylabel("Score")
-        ax1.set_title(f"{country_input} vs Global Factor Averages", fontsize=12)
-        ax1.tick_params(axis='x', rotation=45)
-        ax1.grid(axis='y', linestyle='--', alpha=0.6)
-        st.pyplot(fig1)
+        show_figure(figures.country_factors, country_input, country_values, global_avg)
 
         st.markdown("#### Interpretation")
         above_avg = diff[diff > 0].index.tolist()
@@ -101,18 +82,49 @@ with col1:
             st.success(f"**Above average in:** {', '.join(above_avg)}")
         if below_avg:
             st.error(f"**Below average in:** {', '.join(below_avg)}")
+
+        # Rank under custom weights on the score's parts, among all of this year's countries
+        st.markdown("#### What-If Rank")
+        weights = scenario_weights("country_explorer")
+        published_rank = int(country_row["Happiness Rank"])
+        what_if_rank = scenario_table(year).rank_of(country_input, weights)
+        st.metric(
+            "Rank under these weights", f"#{what_if_rank}", delta=published_rank - what_if_rank,
+            help=f"Published rank: #{published_rank}. A positive change means the country moves up.",
+        )
+
+        # Nearest country-years over the six factors, across every year in data/
+        st.markdown("#### Most Similar Countries")
+        normalize = st.toggle("Normalize factors (each counts equally)", value=True, key="similar:normalize")
+        with st.expander("📏 Similarity weights"):
+            st.caption("How much each factor counts in the distance between countries; the score is unaffected.")
+            similarity_weights = {
+                factor: st.slider(factor, 0.0, 3.0, 1.0, step=0.5, key=f"similar:{factor}") for factor in factors
+            }
+        similar = similar_countries(country_input, year, k=5, weights=similarity_weights, normalize=normalize)
+        if similar.empty:
+            st.info(f"{country_input} is missing a factor value in {year}, so it cannot be compared.")
+        else:
+            st.dataframe(similar.style.format({"Happiness Score": "{:.2f}", "Distance": "{:.2f}"}), hide_index=True)
     else:
         st.warning("Country not found. Please check your spelling.")
 
+
 # ===========================
-# COLUMN 2: Rank Range Overview with Pie Chart
+# COLUMN 2: Rank Range Overview with Tree Map
 # ===========================
-with col2:
+@fragment("Country Explorer", "rank range")
+def rank_overview(query, year):
+    # Rank range slider
+    min_rank, max_rank = map(int, query.bounds("Happiness Rank"))
+    rank_range = st.slider("Select rank range", min_rank, max_rank, (1, 20))
+
     st.subheader(f"Countries Ranked Between {rank_range[0]} and {rank_range[1]}")
 
-    filtered_df = df[(df["Happiness Rank"] >= rank_range[0]) & (df["Happiness Rank"] <= rank_range[1])]
-    top5 = filtered_df.nsmallest(5, "Happiness Rank")
-    bottom5 = filtered_df.nlargest(5, "Happiness Rank")
+    # Planned onto the rank-sorted index: a binary-search slice, already in rank order
+    filtered_df = query.where(ranks=rank_range).rows()
+    top5 = filtered_df.head(5)
+    bottom5 = filtered_df.iloc[::-1].head(5)
 
     st.markdown("##### Top 5 in Selected Range")
     st.dataframe(top5[["Country", "Happiness Score"]].reset_index(drop=True))
@@ -120,50 +132,44 @@ with col2:
     st.markdown("##### Bottom 5 in Selected Range")
     st.dataframe(bottom5[["Country", "Happiness Score"]].reset_index(drop=True))
 
-
     # Tree Map: Happiness Scores in Selected Rank Range
-st.markdown("#### Tree Map: Happiness Scores")
-
-fig_tree = px.treemap(
-    filtered_df,
-    path=["Country"],
-    values="Happiness Score",
-    color="Happiness Score",
-    color_continuous_scale=px.colors.sequential.Tealgrn,
-    title="Tree Map of Happiness Scores by Country",
-    hover_data={"Happiness Score": ':.2f'},  # show score with 2 decimals on hover
-)
-# Improve layout for clarity and spacing
-fig_tree.update_layout(
-    margin=dict(t=60, l=10, r=10, b=10),
-    title_font_size=20,
-)
-# Enhance text visibility inside the treemap
-fig_tree.data[0].texttemplate = "%{label}<br>%{value:.2f}"
-st.plotly_chart(fig_tree, use_container_width=True)
+    st.markdown("#### Tree Map: Happiness Scores")
+
+    # Cached per rank range; carries only country names and scores
+    fig_tree = treemap(year, rank_range)
+    st.plotly_chart(fig_tree, use_container_width=True)
+
+
+# ---------------------------
+# Layout: Two Column Display
+# ---------------------------
+# Each column is a fragment with its own control: picking a country reruns only
+# column 1, moving the rank slider only column 2 and its tree map. The year in
+# the sidebar feeds everything, so it still reruns the whole page.
+col1, col2 = st.columns(2)
+
+with col1:
+    country_profile(query, year)
+
+with col2:
+    rank_overview(query, year)
 
 
 # ===========================
 # Global Choropleth Map
 # ===========================
 st.markdown("---")
-st.subheader("World Happiness Scores (2015)")
+st.subheader(f"World Happiness Scores ({year})")
 
 try:
-    fig_map = px.choropleth(
-        df,
-        locations="Country",
-        locationmode="country names",
-        color="Happiness Score",
-        hover_name="Country",
-        color_continuous_scale="YlGnBu",
-        title="Global Happiness Distribution (2015)",
-    )
-    fig_map.update_layout(margin={"r": 50, "t": 30, "l": 0, "b": 0})
+    # ISO-3 codes resolved on the server; the figure is built once per year
+    fig_map = choropleth(year)
     st.plotly_chart(fig_map, use_container_width=True)
 except ModuleNotFoundError:
     st.warning("Plotly is not installed. Please run `pip install plotly` to view the map.")
 
+profiling.finish()
+
 # ===========================
 # Navigation Links
 # ===========================
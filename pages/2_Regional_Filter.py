@@ -2,14 +2,19 @@
 
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import numpy as np
+
+from happiness import figures, profiling, refresh, settings, warmup
+from happiness.query import Query
+from happiness.render import ChartBatch
+from happiness.ui import fragment, year_selector
 
 # ---------------------------
 # Page Config
 # ---------------------------
 st.set_page_config(page_title="Regional Filter", layout="wide")
+profiling.begin("Regional Filter")
+warmup.start()
+refresh.live_updates()
 st.title("🌍 Regional Happiness Comparison")
 
 st.markdown("""
@@ -18,13 +23,10 @@ This page helps identify strengths, weaknesses, and relationships between happin
 """)
 
 # ---------------------------
-# Load Data
+# Load Data (shared across sessions)
 # ---------------------------
-@st.cache_data
-def load_data():
-    return pd.read_csv("data/2015.csv")
-
-df = load_data()
+year = year_selector()
+query = Query(year)  # filters, averages and statistics are planned by happiness.query
 
 # ---------------------------
 # Sidebar Filters
@@ -32,24 +34,89 @@ df = load_data()
 with st.sidebar:
     st.header("🌐 Filters")
     
-    region_list = sorted(df["Region"].unique())
+    region_list = query.distinct("Region")
     selected_region = st.selectbox("Select Region:", region_list)
 
-    metric_options = [
-        "Economy (GDP per Capita)", "Family", "Health (Life Expectancy)",
-        "Freedom", "Trust (Government Corruption)", "Generosity"
-    ]
+# ---------------------------
+# Filter Region Data
+# ---------------------------
+region_query = query.where(region=selected_region)
+region_df = region_query.rows(order="score")
+region_df = region_df.astype({"Country": str})  # only this region's countries as hue levels
+
+# Precomputed for every year x region x metric; selecting is a lookup
+extremes = region_query.extremes()
+
+metric_options = [
+    "Economy (GDP per Capita)", "Family", "Health (Life Expectancy)",
+    "Freedom", "Trust (Government Corruption)", "Generosity"
+]
+
+
+# ---------------------------
+# Metric Comparison (reruns on its own when the metric changes)
+# ---------------------------
+@fragment("Regional Filter", "metric comparison")
+def metric_comparison(query, region_query, region_df, selected_region):
     selected_metric = st.selectbox("Compare with metric:", metric_options)
+    fit = region_query.fit(selected_metric)
+    charts = ChartBatch()
+
+    st.subheader(f"📉 {selected_metric} vs Happiness Score")
+
+    # Add regression line (no fit when the metric is constant across the region)
+    trend = {}
+    if pd.notna(fit["slope"]):
+        trend = {"slope": fit["slope"], "intercept": fit["intercept"], "corr": fit["pearson"]}
+
+    # Past HAPPINESS_SCATTER_MAX_POINTS (e.g. sub-national rows) draw binned counts instead of one dot per row
+    if len(region_df) > settings.SCATTER_MAX_POINTS:
+        grid = figures.density_grid(region_df, selected_metric)
+        charts.show(figures.metric_density, grid, selected_metric, **trend)
+    else:
+        scatter_df = region_df[["Country", selected_metric, "Happiness Score"]]
+        charts.show(figures.metric_scatter, scatter_df, selected_metric, **trend)
+
+    if trend:
+        st.caption(
+            f"Slope: {fit['slope']:.2f} · Pearson r: {fit['pearson']:.2f} · "
+            f"Spearman ρ: {fit['spearman']:.2f} · Countries: {int(fit['count'])}"
+        )
+
+    # Region Metric Interpretation
+    st.markdown("#### 📊 Metric Strength Analysis")
+
+    avg_metric_score = fit["mean"]
+    global_avg = query.mean([selected_metric])[selected_metric]
+    metric_strength = "above" if avg_metric_score > global_avg else "below"
+    metric_diff = abs(avg_metric_score - global_avg)
+
+    st.markdown(f"""
+In *{selected_region}, the average **{selected_metric}* score is *{avg_metric_score:.2f}*,  
+which is *{metric_strength} the global average* of *{global_avg:.2f}*  
+(difference: {metric_diff:.2f}). This may suggest a regional trend worth exploring.
+""")
+
+    charts.wait()
+
 
 # ---------------------------
-# Filter Region Data
+# Correlation Matrix (reruns on its own when the method or scope changes)
 # ---------------------------
-region_df = df[df["Region"] == selected_region]
+@fragment("Regional Filter", "correlation matrix")
+def correlation_panel(query, region_query, selected_region):
+    with st.expander("🔗 Correlation Matrix"):
+        method = st.radio("Method", ["pearson", "spearman"], horizontal=True, format_func=str.title)
+        scope = st.radio("Countries", [selected_region, "All regions"], horizontal=True)
+        corr = (query if scope == "All regions" else region_query).correlation(method)
+        st.dataframe(corr.style.background_gradient(cmap="RdBu_r", vmin=-1, vmax=1).format("{:.2f}"))
+
 
 # ---------------------------
 # Layout
 # ---------------------------
 col1, col2 = st.columns(2)
+charts = ChartBatch()
 
 # ---------------------------
 # Column 1: Box Plot & Summary
@@ -57,79 +124,32 @@ col1, col2 = st.columns(2)
 with col1:
     st.subheader(f"📦 Happiness Score Distribution in {selected_region}")
 
-    fig1, ax1 = plt.subplots(figsize=(6, 4))
-    sns.boxplot(data=region_df, y="Happiness Score", color="#48cae4", ax=ax1)
-
-    mean_score = region_df["Happiness Score"].mean()
-    ax1.axhline(mean_score, color="red", linestyle="--", label=f"Mean: {mean_score:.2f}")
-    ax1.set_title("Box Plot of Happiness Scores")
-    ax1.set_ylabel("Happiness Score")
-    ax1.legend()
-    st.pyplot(fig1)
+    charts.show(figures.score_boxplot, region_df["Happiness Score"])
 
     # Display Summary Stats
-    top_country = region_df.loc[region_df["Happiness Score"].idxmax()]
-    bottom_country = region_df.loc[region_df["Happiness Score"].idxmin()]
-    score_range = top_country["Happiness Score"] - bottom_country["Happiness Score"]
-
     st.markdown("#### 🔎 Summary")
-    st.success(f"Top: *{top_country['Country']}* – {top_country['Happiness Score']:.2f}")
-    st.error(f"Bottom: *{bottom_country['Country']}* – {bottom_country['Happiness Score']:.2f}")
-    st.info(f"📏 Score Range in Region: *{score_range:.2f}*")
+    st.success(f"Top: *{extremes['top_country']}* – {extremes['top_score']:.2f}")
+    st.error(f"Bottom: *{extremes['bottom_country']}* – {extremes['bottom_score']:.2f}")
+    st.info(f"📏 Score Range in Region: *{extremes['range']:.2f}*")
 
 # ---------------------------
-# Column 2: Scatter Plot + Correlation
+# Column 2: Scatter Plot, Correlation & Metric Analysis
 # ---------------------------
 with col2:
-    st.subheader(f"📉 {selected_metric} vs Happiness Score")
+    metric_comparison(query, region_query, region_df, selected_region)
 
-    fig2, ax2 = plt.subplots(figsize=(6, 4))
-    sns.scatterplot(
-        data=region_df,
-        x=selected_metric,
-        y="Happiness Score",
-        hue="Country",
-        palette="viridis",
-        s=90,
-        ax=ax2,
-        legend=False
-    )
-
-    # Add regression line
-    x = region_df[selected_metric]
-    y = region_df["Happiness Score"]
-    if len(x.unique()) > 1:  # Avoid crash if all values are the same
-        m, b = np.polyfit(x, y, 1)
-        ax2.plot(x, m * x + b, color='black', linestyle='--', label='Trend Line')
-        corr = np.corrcoef(x, y)[0, 1]
-        ax2.legend(title=f"Corr: {corr:.2f}")
-    
-    ax2.set_title(f"Happiness vs {selected_metric}")
-    ax2.set_xlabel(selected_metric)
-    ax2.set_ylabel("Happiness Score")
-    ax2.grid(True)
-    st.pyplot(fig2)
+correlation_panel(query, region_query, selected_region)
 
 # ---------------------------
-# Region Metric Interpretation
+# Full Data Table
 # ---------------------------
-st.markdown("### 📊 Metric Strength Analysis")
+st.markdown("### 📋 Regional Data Table")
 
-avg_metric_score = region_df[selected_metric].mean()
-global_avg = df[selected_metric].mean()
-metric_strength = "above" if avg_metric_score > global_avg else "below"
-metric_diff = abs(avg_metric_score - global_avg)
-
-st.markdown(f"""
-In *{selected_region}, the average **{selected_metric}* score is *{avg_metric_score:.2f}*,  
-which is *{metric_strength} the global average* of *{global_avg:.2f}*  
-(difference: {metric_diff:.2f}). This may suggest a regional trend worth exploring.
-""")
+# Every factor, so the table does not depend on the metric picked in column 2
+st.dataframe(region_df[["Country", "Happiness Score"] + metric_options + ["Region"]].reset_index(drop=True))
 
 # ---------------------------
-# Full Data Table
+# Fill In Chart Placeholders
 # ---------------------------
-st.markdown("### 📋 Regional Data Table")
-
-sorted_df = region_df.sort_values("Happiness Score", ascending=False)
-st.dataframe(sorted_df[["Country", "Happiness Score", selected_metric, "Region"]].reset_index(drop=True))
\ No newline at end of file
+charts.wait()
+profiling.finish()
@@ -1,110 +1,138 @@
-
-# -----------------------------------------------------------------------------------------
-# 📄 Page: Top Trends in Global Happiness (2015)
-# -----------------------------------------------------------------------------------------
-
-# ---------------------------
-# Import Required Libraries
-# ---------------------------
-import streamlit as st               # Streamlit for interactive UI
-import pandas as pd                  # Pandas for data manipulation
-import matplotlib.pyplot as plt      # Matplotlib for static visualizations
-import seaborn as sns                ## Seaborn for enhanced plotting
-
-# ---------------------------
-# Page Configuration
-# ---------------------------
-st.set_page_config(page_title="Top Trends", layout="wide")     ## page title and layout
-
-# ---------------------------
-# Load Dataset with Caching
-# ---------------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("data/2015.csv")  # Adjust path if needed
-    return df
-
-df = load_data()
-
-st.title("📊 Top Trends in Global Happiness (2015)")            # Main page title
-
-# ---------------------------
-# Sidebar: Filter Options
-# ---------------------------
-st.sidebar.header("🔍 Filter Options")
-
-# Text input: Optional search for a country
-country_input = st.sidebar.text_input("Search Country (optional):").strip().lower()
-
-# Slider: Minimum happiness score
-min_score = st.sidebar.slider("Minimum Happiness Score", 2.0, 8.0, 5.0)
-
-# Selectbox: Filter by Region
-regions = df["Region"].unique()
-selected_region = st.sidebar.selectbox("Select Region (optional):", ["All"] + sorted(regions.tolist()))
-
-# ---------------------------
-# Data Filtering Based on Inputs
-# ---------------------------
-filtered_df = df[df["Happiness Score"] >= min_score]
-if selected_region != "All":
-    filtered_df = filtered_df[filtered_df["Region"] == selected_region]
-if country_input:
-    filtered_df = filtered_df[filtered_df["Country"].str.lower().str.contains(country_input)]
-
-# ---------------------------
-# Trend 1: Top 10 Happiest Countries
-# ---------------------------
-st.subheader("🏅 Top 10 Happiest Countries")
-
-top10 = filtered_df.sort_values("Happiness Score", ascending=False).head(10)
-
-fig1, ax1 = plt.subplots(figsize=(10, 5))
-sns.barplot(x="Happiness Score", y="Country", data=top10, hue="Country", palette="viridis", ax=ax1,legend=False)
-ax1.set_title("Top 10 Happiest Countries (Filtered)")
-st.pyplot(fig1)
-
-# ---------------------------
-# Trend 2: Average Contribution of Each Factor
-# ---------------------------
-st.subheader("📈 Average Factor Contributions")
-
-factors = [
-    "Economy (GDP per Capita)",
-    "Family",
-    "Health (Life Expectancy)",
-    "Freedom",
-    "Trust (Government Corruption)",
-    "Generosity"
-]
-
-avg_factors = filtered_df[factors].mean().sort_values(ascending=False)
-
-fig2, ax2 = plt.subplots(figsize=(10, 5))
-avg_factors.plot(kind='bar', color='skyblue', ax=ax2, edgecolor="black")
-ax2.set_title("Average Contribution of Each Factor to Happiness")
-ax2.set_ylabel("Score")
-st.pyplot(fig2)
-
-# ---------------------------
-# Trend 3: Region-wise Happiness Scores
-# ---------------------------
-st.subheader("🌍 Regional Happiness Trends")
-
-region_avg = filtered_df.groupby("Region")["Happiness Score"].mean().sort_values(ascending=False)
-
-fig3, ax3 = plt.subplots(figsize=(10, 6))
-region_avg.plot(kind="barh", color="coral", ax=ax3)
-ax3.set_title("Average Happiness Score by Region (Filtered)")
-ax3.set_xlabel("Average Score")
-st.pyplot(fig3)
-
-# ---------------------------
-# Final Table: Display Filtered Dataset
-# ---------------------------
-st.subheader("📋 Filtered Data Table")
-
-if not filtered_df.empty:
-    st.dataframe(filtered_df.reset_index(drop=True), use_container_width=True)
-else:
-    st.warning("⚠️ No data available for the selected filters.")
+
+# -----------------------------------------------------------------------------------------
+# 📄 Page: Top Trends in Global Happiness (by year)
+# -----------------------------------------------------------------------------------------
+
+# ---------------------------
+# Import Required Libraries
+# ---------------------------
+import streamlit as st               # Streamlit for interactive UI
+
+from happiness import figures, profiling, refresh, warmup  # Chart builders, opt-in timings, live data, cold start
+from happiness.query import Query    # Planned filters: indexes, trigram search or the aggregate cube
+from happiness.render import ChartBatch  # Background chart rendering with a shared image cache
+from happiness.scenarios import PRESETS, is_published, scenario_table  # What-if weights on the score's parts
+from happiness.ui import fragment, scenario_weights, year_selector
+
+# ---------------------------
+# Page Configuration
+# ---------------------------
+st.set_page_config(page_title="Top Trends", layout="wide")     ## page title and layout
+profiling.begin("Top Trends")                                    ## opt-in rerun timings
+warmup.start()                                                   ## once-per-server background warm-up
+refresh.live_updates()                                           ## rerun when data/ changes
+
+# ---------------------------
+# Load Dataset (parsed once per server, shared by all sessions)
+# ---------------------------
+year = year_selector()                # Sidebar: which yearly report to show
+query = Query(year)
+
+st.title(f"📊 Top Trends in Global Happiness ({year})")            # Main page title
+
+factors = [
+    "Economy (GDP per Capita)",
+    "Family",
+    "Health (Life Expectancy)",
+    "Freedom",
+    "Trust (Government Corruption)",
+    "Generosity"
+]
+
+
+# ---------------------------
+# Filtered Trends (a fragment: changing a filter reruns only this section)
+# ---------------------------
+@fragment("Top Trends", "filtered trends")
+def filtered_trends(query):
+    charts = ChartBatch()             # Charts get a placeholder now and fill in when rendered
+
+    # ---------------------------
+    # Filter Options (in the section, since fragments cannot write to the sidebar)
+    # ---------------------------
+    st.subheader("🔍 Filter Options")
+    search_col, score_col, region_col = st.columns(3)
+
+    # Text input: Optional search for a country
+    country_input = search_col.text_input("Search Country (optional):").strip().lower()
+
+    # Slider: Minimum happiness score
+    min_score = score_col.slider("Minimum Happiness Score", 2.0, 8.0, 5.0, step=0.01)
+
+    # Selectbox: Filter by Region
+    regions = query.distinct("Region")
+    selected_region = region_col.selectbox("Select Region (optional):", ["All"] + regions)
+
+    # Sliders: What-if weights on the six factors and the Dystopia Residual
+    weights = scenario_weights("top_trends")
+    what_if = not is_published(weights)
+
+    # ---------------------------
+    # Data Filtering Based on Inputs
+    # ---------------------------
+    region_filter = None if selected_region == "All" else selected_region
+
+    # Score threshold + region go through the score index, a search through the trigram index
+    filtered = query.where(min_score=min_score, region=region_filter, search=country_input)
+    filtered_df = filtered.rows(order="score")
+    if what_if:
+        # One matrix-vector product re-scores every country; rows come back by scenario rank
+        filtered_df = scenario_table(query.year).annotate(filtered_df, weights)
+
+    # ---------------------------
+    # Trend 1: Top 10 Happiest Countries
+    # ---------------------------
+    st.subheader("🏅 Top 10 Happiest Countries")
+
+    score = "Scenario Score" if what_if else "Happiness Score"
+    top10 = filtered_df.head(10)  # rows are already sorted by descending (scenario) score
+    top10 = top10[["Country", score]].astype({"Country": str})  # plain labels so seaborn keeps the sorted order
+
+    charts.show(figures.top10_bar, top10, score=score)
+
+    # ---------------------------
+    # Trend 2: Average Contribution of Each Factor
+    # ---------------------------
+    st.subheader("📈 Average Factor Contributions")
+
+    # Read from the cube for score + region filters; a country search averages the matching rows
+    avg_factors = filtered.mean(factors).sort_values(ascending=False)
+
+    charts.show(figures.factor_bar, avg_factors)
+
+    # ---------------------------
+    # Trend 3: Region-wise Happiness Scores
+    # ---------------------------
+    st.subheader("🌍 Regional Happiness Trends")
+
+    region_avg = filtered.mean_by_region("Happiness Score").sort_values(ascending=False)
+
+    if region_avg.empty:
+        st.info("No region has a country matching the filters.")
+    else:
+        charts.show(figures.region_barh, region_avg)
+
+    # ---------------------------
+    # Final Table: Display Filtered Dataset
+    # ---------------------------
+    st.subheader("📋 Filtered Data Table")
+
+    if not filtered_df.empty:
+        st.dataframe(filtered_df.reset_index(drop=True), use_container_width=True)
+
+        # Every preset plus the sliders' weights, scored and ranked as one batch
+        with st.expander("📐 Ranks under preset scenarios"):
+            _, ranks = scenario_table(query.year).evaluate({**PRESETS, "Your weights": weights})
+            shown = ranks.loc[filtered_df["Country"].astype(str)].sort_values("Your weights", kind="stable")
+            st.dataframe(shown, use_container_width=True)
+    else:
+        st.warning("⚠️ No data available for the selected filters.")
+
+    # ---------------------------
+    # Fill In Chart Placeholders
+    # ---------------------------
+    charts.wait()
+
+
+filtered_trends(query)
+profiling.finish()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from conftest import DATA_DIR, write_releases
+
+from happiness import aggregates, data, stats
+from happiness.data import load_data
+
+# Loader, and the module and name of the builder it hands to rebuild_by_group
+TABLES = {
+    "cube": (aggregates.load_cube, aggregates, "build_cube"),
+    "metric_stats": (stats.metric_stats, stats, "build_metric_stats"),
+    "region_extremes": (stats.region_extremes, stats, "build_region_extremes"),
+}
+
+
+@pytest.fixture
+def edit_release():
+    """Rewrite ``2018.csv`` through ``edit(frame)`` and move to the new data; the release is restored afterwards."""
+    def edit(change):
+        path = DATA_DIR / "2018.csv"
+        path.write_text(change(pd.read_csv(path)).to_csv(index=False))
+        assert data.advance() is not None
+
+    yield edit
+    write_releases(DATA_DIR)
+    data.advance()
+
+
+def edited(release):
+    # One score changed, one country dropped and one added: three groups across regions
+    release.loc[release["Country or region"] == "Denmark", "Score"] += 0.5
+    release = release[release["Country or region"] != "Chad"]
+    added = release[release["Country or region"] == "Japan"].assign(**{"Country or region": "Lemuria"})
+    return pd.concat([release, added], ignore_index=True)
+
+
+@pytest.mark.parametrize("name", TABLES)
+def test_rebuild_matches_full_groupby(name, edit_release, monkeypatch):
+    load, module, builder = TABLES[name]
+    build = getattr(module, builder)
+    load_data()
+    load()  # built in full on the current data
+    edit_release(edited)
+
+    built = []
+    monkeypatch.setattr(module, builder, lambda rows: built.append(rows) or build(rows))
+    rebuilt = load()
+    change = data.snapshot().change()
+    assert len(change.groups) == 3
+    assert set(zip(built[0]["Year"], built[0]["Region"].astype(str))) == change.groups  # only the changed groups
+
+    full = build(load_data())
+    pd.testing.assert_frame_equal(rebuilt.sort_index(), full.sort_index())
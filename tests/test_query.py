@@ -0,0 +1,108 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness import settings
+from happiness.aggregates import MEASURES
+from happiness.data import load_data
+from happiness.query import COVERS, Query
+
+SCORE = "Happiness Score"
+RANK = "Happiness Rank"
+
+
+@pytest.mark.parametrize("min_score", [5.2, 5.196, 4.0051])
+def test_aggregates_agree_with_rows(min_score):
+    # Off a bucket edge the cube would count the threshold's whole bucket
+    query = Query(2015, min_score=min_score)
+    rows = query.rows()
+    assert query.count_by_region().sum() == len(rows)
+    np.testing.assert_allclose(query.mean([SCORE])[SCORE], rows[SCORE].mean())
+
+
+# ---------------------------
+# Plans vs Plain pandas
+# ---------------------------
+def random_query(rng, rows):
+    """A query over 2015, 2018 or every year with a random mix of filters."""
+    filters = {"year": [2015, 2018, None][rng.integers(3)]}
+    countries = rows["Country"].astype(str).unique()
+    if rng.random() < 0.2:
+        filters["country"] = str(rng.choice(countries))
+    if rng.random() < 0.4:
+        filters["region"] = str(rng.choice(rows["Region"].astype(str).unique()))
+    if rng.random() < 0.3:
+        low, high = sorted(rng.integers(1, len(countries), size=2))
+        filters["ranks"] = (None if rng.random() < 0.2 else int(low), None if rng.random() < 0.2 else int(high))
+    if rng.random() < 0.5:
+        # On a bucket edge, off one, or exactly some country's score
+        filters["min_score"] = float(rng.choice([
+            round(rng.uniform(3, 7.5), 2), round(rng.uniform(3, 7.5), 4), rng.choice(rows[SCORE]),
+        ]))
+    if rng.random() < 0.3:
+        name = str(rng.choice(countries))
+        start = rng.integers(len(name))
+        filters["search"] = f" {name[start:start + rng.integers(1, 6)].upper()} " if rng.random() < 0.9 else "zz"
+    return filters
+
+
+def pandas_rows(filters):
+    """The rows matching ``filters``, by boolean masks over the table."""
+    rows = load_data(filters["year"]) if filters["year"] is not None else load_data()
+    mask = pd.Series(True, index=rows.index)
+    if "country" in filters:
+        mask &= rows["Country"] == filters["country"]
+    if "region" in filters:
+        mask &= rows["Region"] == filters["region"]
+    if "ranks" in filters:
+        low, high = filters["ranks"]
+        mask &= rows[RANK].between(-np.inf if low is None else low, np.inf if high is None else high)
+    if "min_score" in filters:
+        mask &= rows[SCORE] >= filters["min_score"]
+    if "search" in filters:
+        mask &= rows["Country"].astype(str).str.lower().str.contains(filters["search"].strip().lower(), regex=False)
+    return rows[mask]
+
+
+def keys(rows):
+    return sorted(zip(rows["Country"].astype(str), rows["Year"]))
+
+
+@pytest.mark.parametrize("engine", ["pandas", "duckdb"])
+def test_plans_agree_with_pandas(engine, monkeypatch):
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+        from happiness import duckdb_engine
+
+        # st.cache_resource does not cache outside a running app; keep one database as the server does
+        monkeypatch.setattr(duckdb_engine, "_database", functools.lru_cache(duckdb_engine._database))
+    monkeypatch.setattr(settings, "QUERY_ENGINE", engine)
+    rng = np.random.default_rng(2015)
+    table = load_data()
+    plans = set()
+    for _ in range(300):
+        filters = random_query(rng, table)
+        query, expected = Query(**filters), pandas_rows(filters)
+        plans.add(query.explain("mean") if query.uses_cube() else query.access_path())
+
+        by_rank, by_score = query.rows(), query.rows(order="score")
+        assert keys(by_rank) == keys(expected) == keys(by_score), query
+        # Without a year, rows come by year and then rank, as in the table
+        assert by_rank.sort_values(["Year", RANK], kind="stable").index.equals(by_rank.index), query
+        assert by_score[SCORE].is_monotonic_decreasing, query
+
+        np.testing.assert_allclose(query.mean(MEASURES), expected[MEASURES].mean(), err_msg=repr(query))
+        measure = MEASURES[rng.integers(len(MEASURES))]
+        by_region = expected.groupby(expected["Region"].astype(str))[measure].mean()
+        pd.testing.assert_series_equal(
+            query.mean_by_region(measure).sort_index(), by_region.sort_index(), check_names=False,
+        )
+        assert query.count_by_region().to_dict() == expected["Region"].astype(str).value_counts().to_dict()
+        assert query.distinct("Region") == sorted(expected["Region"].astype(str).unique())
+        # DuckDB gives None where pandas gives NaN for no rows
+        bounds = np.array(query.bounds(SCORE), dtype=float)
+        np.testing.assert_array_equal(bounds, (expected[SCORE].min(), expected[SCORE].max()))
+    if engine == "pandas":
+        assert plans == set(COVERS) | {"aggregate cube"}
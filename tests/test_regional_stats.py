@@ -0,0 +1,23 @@
+import numpy as np
+
+from happiness.query import Query
+
+TRUST = "Trust (Government Corruption)"
+
+
+def test_fit_without_values_is_empty():
+    # Atlantis is alone in "Other" in 2018 and has no corruption value
+    for query in (Query(2018, region="Other"), Query(2018, region="Other", min_score=0.0)):
+        fit = query.fit(TRUST)
+        assert fit["count"] == 0
+        assert np.isnan(fit["slope"]) and np.isnan(fit["mean"])
+
+
+def test_fit_matches_numpy():
+    rows = Query(2015, region="Western Europe").rows().dropna(subset=[TRUST])
+    fit = Query(2015, region="Western Europe").fit(TRUST)
+    slope, intercept = np.polyfit(rows[TRUST], rows["Happiness Score"], 1)
+    assert fit["count"] == len(rows)
+    np.testing.assert_allclose([fit["slope"], fit["intercept"]], [slope, intercept])
+    np.testing.assert_allclose(fit["pearson"], np.corrcoef(rows[TRUST], rows["Happiness Score"])[0, 1])
+    np.testing.assert_allclose(fit["spearman"], rows[[TRUST, "Happiness Score"]].corr("spearman").iloc[0, 1])
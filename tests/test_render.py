@@ -0,0 +1,29 @@
+import importlib.util
+
+from happiness import figures, render
+from happiness.result_cache import MemoryBackend, ResultCache
+
+
+def load_builder(tmp_path, name, body):
+    path = tmp_path / f"{name}.py"
+    path.write_text(f"def bar(values):\n    return {body}\n")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.bar
+
+
+def test_key_changes_with_the_builder_code(tmp_path):
+    # Same name and arguments, edited code: a shared cache must not serve the old image
+    old, new = load_builder(tmp_path, "old", "values"), load_builder(tmp_path, "new", "values[::-1]")
+    assert render.figure_key(old, [1, 2]) != render.figure_key(new, [1, 2])
+    assert render.figure_key(old, [1, 2]) != render.figure_key(old, [2, 1])
+
+
+def test_cached_png_is_stored_under_figure_key(monkeypatch):
+    cache = ResultCache(MemoryBackend(64 * 1024 * 1024, 0))
+    monkeypatch.setattr(render, "results", lambda: cache)
+    args = (figures.pd.Series([1.0, 2.0], index=["a", "b"]), "viridis", "Title", "x")
+    image = render.cached_png(figures.region_bar, *args)
+    assert image.startswith(b"\x89PNG")
+    assert cache.get(render.figure_key(figures.region_bar, *args)) == image
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from happiness.data import load_data
+from happiness.scenarios import PRESETS, scenario_table
+
+
+def published(year):
+    rows = load_data(year)
+    return dict(zip(rows["Country"].astype(str), rows["Happiness Rank"]))
+
+
+@pytest.mark.parametrize("year", [2015, 2018])
+def test_published_weights_give_published_ranks(year):
+    scores, ranks = scenario_table(year).evaluate({"Published": {}, **PRESETS})
+    assert ranks["Published"].to_dict() == published(year)
+    assert ranks["Published"].equals(ranks[next(iter(PRESETS))])
+
+
+def test_missing_factor_keeps_published_rank():
+    # Its residual is left NaN by harmonize; all weights at 1 must still give the published score
+    table = scenario_table(2018)
+    assert table.rank_of("United Arab Emirates", {}) == published(2018)["United Arab Emirates"]
+    rows = load_data(2018)
+    uae = rows[rows["Country"] == "United Arab Emirates"]
+    np.testing.assert_allclose(table.annotate(uae, {})["Scenario Score"], uae["Happiness Score"])
+
+
+def test_rank_of_matches_evaluate():
+    table = scenario_table(2015)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        weights = {"Freedom": rng.uniform(0, 3), "Family": rng.uniform(0, 3), "Dystopia Residual": rng.uniform(0, 3)}
+        _, ranks = table.evaluate({"custom": weights})
+        for country in table.countries[::10]:
+            assert table.rank_of(country, weights) == ranks.loc[country, "custom"]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from happiness.data import FACTORS, load_data
+from happiness.similarity import similar_countries
+
+
+def brute_force(country, year, k, weights, normalize):
+    """Every country's closest year by a full pairwise distance, sorted."""
+    rows = load_data().dropna(subset=FACTORS).astype({"Country": str})
+    values = rows[FACTORS].to_numpy()
+    if normalize:
+        values = values / np.where(values.std(axis=0) > 0, values.std(axis=0), 1.0)
+    w = np.array([weights.get(factor, 1.0) for factor in FACTORS])
+    probe = values[((rows["Country"] == country) & (rows["Year"] == year)).to_numpy()][0]
+    rows = rows.assign(Distance=np.sqrt((w * (values - probe) ** 2).sum(axis=1)))
+    closest = rows[rows["Country"] != country].sort_values("Distance", kind="stable").drop_duplicates("Country")
+    return closest.head(k)
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_nearest_matches_brute_force(normalize):
+    rng = np.random.default_rng(2020)
+    rows = load_data().dropna(subset=FACTORS)
+    for _ in range(40):
+        country, year = rows.iloc[rng.integers(len(rows))][["Country", "Year"]]
+        weights = {factor: rng.uniform(0, 3) for factor in FACTORS if rng.random() < 0.5}
+        k = int(rng.integers(1, 12))
+        found = similar_countries(country, year, k, weights, normalize)
+        expected = brute_force(country, year, k, weights, normalize)
+        np.testing.assert_allclose(found["Distance"], expected["Distance"], atol=1e-9)
+        assert list(found["Country"]) == list(expected["Country"])
+
+
+def test_country_without_factors_has_no_neighbours():
+    # The United Arab Emirates has no corruption value in 2018
+    assert similar_countries("United Arab Emirates", 2018).empty
+    assert not similar_countries("United Arab Emirates", 2015).empty
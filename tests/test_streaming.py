@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.data import FACTORS
+from happiness.streaming import fold_respondents
+
+SCORE = "Happiness Score"
+REGIONS = {"Denmark": "Western Europe", "Chad": "Sub-Saharan Africa", "Taiwan": "Eastern Asia", "Peru": None}
+
+
+def respondents(rng, n):
+    """Respondent rows with 2020-style names, missing answers and weights, and an aliased country."""
+    country = rng.choice(list(REGIONS) + ["Taiwan Province of China"], size=n)
+    rows = pd.DataFrame({
+        "Country name": [f" {name}" if rng.random() < 0.1 else name for name in country],
+        "Regional indicator": [REGIONS.get(name, "Eastern Asia") for name in country],
+        "Life Ladder": rng.normal(5.5, 1.5, size=n).round(3),
+        "Freedom": rng.uniform(0, 1, size=n).round(3),
+        "Generosity": rng.uniform(0, 0.5, size=n).round(3),
+        "wgt": rng.uniform(0.5, 1.5, size=n).round(3),
+    })
+    for col in ("Life Ladder", "Freedom", "wgt"):
+        rows.loc[rng.random(n) < 0.05, col] = np.nan
+    rows.loc[rows["Country name"].str.strip() == "Peru", "Life Ladder"] = np.nan  # no answers: no row
+    return rows
+
+
+def pandas_summary(rows):
+    """The same summary from the whole frame at once."""
+    rows = rows.rename(columns={"Country name": "Country", "Life Ladder": SCORE, "wgt": "Weight"})
+    rows["Country"] = rows["Country"].str.strip().replace({"Taiwan Province of China": "Taiwan"})
+    out = {}
+    for country, group in rows.dropna(subset=["Weight"]).groupby("Country"):
+        answered = group.dropna(subset=[SCORE])
+        if answered.empty:
+            continue
+        w, y = answered["Weight"], answered[SCORE]
+        mean = np.average(y, weights=w)
+        n_eff = w.sum() ** 2 / (w ** 2).sum()
+        summary = {SCORE: mean, "Standard Error": np.sqrt(np.average((y - mean) ** 2, weights=w) / (n_eff - 1))}
+        for col in ("Freedom", "Generosity"):
+            valid = group.dropna(subset=[col])
+            summary[col] = np.average(valid[col], weights=valid["Weight"])
+        summary["Region"] = group["Regional indicator"].iloc[0]
+        out[country] = summary
+    out = pd.DataFrame.from_dict(out, orient="index")
+    out["Happiness Rank"] = out[SCORE].rank(ascending=False, method="min").astype("int64")
+    return out.sort_index()
+
+
+@pytest.mark.parametrize("chunk_rows", [64, 1000, 100_000])
+def test_fold_matches_pandas(tmp_path, chunk_rows):
+    rows = respondents(np.random.default_rng(chunk_rows), 3000)
+    path = tmp_path / "2020.csv"
+    rows.to_csv(path, index=False)
+
+    folded = fold_respondents(path, 2020, chunk_rows=chunk_rows).astype({"Country": str}).set_index("Country").sort_index()
+    expected = pandas_summary(rows)
+    assert list(folded.index) == list(expected.index) == ["Chad", "Denmark", "Taiwan"]
+    columns = [SCORE, "Standard Error", "Freedom", "Generosity", "Happiness Rank"]
+    pd.testing.assert_frame_equal(folded[columns], expected[columns], check_names=False)
+    assert folded["Region"].astype(str).to_dict() == expected["Region"].to_dict()
+    assert folded[[f for f in FACTORS if f not in ("Freedom", "Generosity")]].isna().all().all()
+    assert (folded["Year"] == 2020).all()